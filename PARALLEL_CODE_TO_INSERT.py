@@ -7,35 +7,39 @@
 
 # COMPETITION REQUIREMENT: Runtime <= 9 hours
 # Using parallel processing to meet this requirement
+import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Must be defined at module level (not inside a function) so executor.map can
+# pickle it by name
+def _safe_process(img_path):
+    """process_image() that returns the zero-signal fallback instead of raising"""
+    try:
+        return process_image(img_path)
+    except Exception as e:
+        print(f"  ✗ Error: {e}")
+        return {"record_id": extract_record_id(img_path), "signals": {lead: np.zeros(SAMPLES_PER_LEAD) for lead in LEAD_NAMES}, "success": False}
+
 
 results = []
 start_time = time.time()
 
-# Parallel processing (3-4x speedup, meets 9-hour requirement)
-max_workers = min(4, len(test_images))
+# Parallel processing, one worker process per CPU core (meets 9-hour requirement)
+n_total = len(test_images)
+max_workers = min(os.cpu_count() or 4, n_total)
 print(f"\n🚀 Using {max_workers} parallel workers (required for < 9 hour runtime)")
 
-with ThreadPoolExecutor(max_workers=max_workers) as executor:
-    future_to_image = {executor.submit(process_image, img_path): img_path for img_path in test_images}
-    
-    completed = 0
-    for future in as_completed(future_to_image):
-        completed += 1
-        try:
-            result = future.result()
-            results.append(result)
-            elapsed = time.time() - start_time
-            avg_time = elapsed / completed if completed > 0 else 0
-            remaining = (len(test_images) - completed) * avg_time if completed > 0 else 0
-            status = "✓" if result.get("success") else "✗"
-            print(f"  [{completed}/{len(test_images)}] {status} {result.get('record_id', 'unknown')} (~{remaining/60:.1f} min remaining)")
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
-            img_path = future_to_image[future]
-            record_id = extract_record_id(img_path)
-            results.append({"record_id": record_id, "signals": {lead: np.zeros(SAMPLES_PER_LEAD) for lead in LEAD_NAMES}, "success": False})
+with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    for completed, result in enumerate(executor.map(_safe_process, test_images, chunksize=8), 1):
+        results.append(result)
+        elapsed = time.time() - start_time
+        avg_time = elapsed / completed
+        remaining = (n_total - completed) * avg_time
+        rid = result.get('record_id', 'unknown')
+        status = "✓" if result.get("success") else "✗"
+        print(f"  [{completed}/{n_total}] {status} {rid} (~{remaining/60:.1f} min remaining)")
 
 elapsed_time = time.time() - start_time
 print(f"\n⏱️  Total processing time: {elapsed_time/60:.1f} minutes ({elapsed_time:.1f} seconds)")
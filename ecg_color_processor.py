@@ -27,15 +27,36 @@ Last Updated: January 2026
 
 import os
 import sys
+import logging
+import logging.handlers
 import cv2
 import numpy as np
 from PIL import Image
 from pathlib import Path
 import json
+import shutil
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, deque
+from itertools import islice
 import tempfile
 import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# orjson is optional - used for fast manifest serialization when installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# threadpoolctl is optional - used to pin BLAS to one thread in worker processes
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    threadpool_limits = None
+    THREADPOOLCTL_AVAILABLE = False
 
 # Set GCS credentials if service account key exists
 SERVICE_ACCOUNT_PATH = r"C:\Users\Rosi\Documents\Maxone Backup\Rosi\Gauntlet2\hat_ecg\service-account-key.json"
@@ -52,6 +73,7 @@ if os.path.exists(SERVICE_ACCOUNT_PATH):
 #   "LOCAL"  - Process local files (no GCS needed) - for testing
 
 MODE = "LOCAL"  # <-- CHANGE THIS TO SWITCH MODES
+CLOUD_MODES = frozenset({"CLOUD", "GROUP"})  # Modes that read from / upload to GCS
 
 # ============================================================================
 #                         LOCAL MODE CONFIGURATION
@@ -194,6 +216,9 @@ MIN_GRID_PIXELS = 5000          # Minimum grid pixels to save grid image
 RED_THRESHOLD_PERCENT = 1.0     # Minimum % of red pixels to consider "has red"
 BLACK_THRESHOLD_PERCENT = 0.5   # Minimum % of black pixels to consider "has black"
 
+# Source image filtering
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')   # str.endswith() takes the tuple directly
+
 # Text removal
 REMOVE_TEXT = True              # Remove text from ECG (black) images
 
@@ -201,10 +226,26 @@ REMOVE_TEXT = True              # Remove text from ECG (black) images
 DELETE_OLD_VERSIONS = True      # Delete output from previous versions
 SAVE_ORIGINALS = True           # Copy original image to output folder
 GENERATE_ANALYSIS_MD = True     # Generate .md analysis file for each image
+MD_WRITE_BUFFER = 1 << 20       # 1 MiB write buffer for analysis reports (fewer syscalls)
+PNG_PARAMS = []                 # cv2.imwrite params for every PNG output. Empty = encoder default,
+                                # which on OpenCV 5 is faster than any explicit zlib level/strategy;
+                                # e.g. [cv2.IMWRITE_PNG_COMPRESSION, 1] pins a level on older builds
 
 # Test limits
 TEST_LIMIT = None               # Set to number to limit images (None = process all)
 
+# Parallelism
+NUM_WORKERS = 1                 # Worker processes for batch runs (1 = process in this process)
+METHOD_WORKERS = 2              # Color separation methods run at once per image (bounds outputs held in memory)
+DOWNLOAD_WORKERS = 16           # Concurrent GCS downloads in GCS -> LOCAL runs (I/O-bound, threads release the GIL)
+DOWNLOAD_PREFETCH = 32          # Max images held in memory ahead of processing
+DELETE_WORKERS = 16             # Threads removing local files in delete_local_files()
+GCS_HTTP_POOL = 32              # Keep-alive HTTP connections held by the shared GCS client
+GCS_LIST_PAGE_SIZE = 1000       # Blobs per list_blobs page (GCS maximum)
+GCS_NAME_FIELDS = "items(name),nextPageToken"  # list_blobs field mask when only names are needed
+GCS_CHUNK_SIZE = 8 * 1024 * 1024  # Download chunk size (must be a multiple of 256 KB)
+GCS_DELETE_BATCH = 100          # Deletes sent per GCS batch request (API maximum)
+
 # Track created files for deletion (with metadata)
 CREATED_FILES = []              # List of {'path': str, 'type': str, 'timestamp': str}
 
@@ -229,18 +270,64 @@ if ENVIRONMENT == "LOCAL":
 else:
     LOCAL_TEMP = KAGGLE_OUTPUT_PATH
 
+# ============================================================================
+#                         LOGGING
+# ============================================================================
+# Per-image progress goes through a buffered handler: records are held in
+# memory and written to stdout in one chunk when the image is finished
+# (flush_log) or when a WARNING+ record arrives, instead of one write per line.
+
+class BatchedStdoutHandler(logging.handlers.BufferingHandler):
+    """Buffer log records and write them to stdout in a single write."""
+    
+    def __init__(self, capacity=1024, flush_level=logging.WARNING):
+        super().__init__(capacity)
+        self.flush_level = flush_level
+        self.setFormatter(logging.Formatter("%(message)s"))
+    
+    def shouldFlush(self, record):
+        return len(self.buffer) >= self.capacity or record.levelno >= self.flush_level
+    
+    def flush(self):
+        self.acquire()
+        try:
+            if self.buffer:
+                sys.stdout.write("".join(self.format(r) + "\n" for r in self.buffer))
+                sys.stdout.flush()
+                self.buffer.clear()
+        finally:
+            self.release()
+
+
+logger = logging.getLogger("ecg_color_processor")
+if not logger.handlers:
+    logger.addHandler(BatchedStdoutHandler())
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def flush_log():
+    """Write any buffered log records to stdout."""
+    for handler in logger.handlers:
+        handler.flush()
+
 # ============================================================================
 #                         FILE TRACKING
 # ============================================================================
 
 def track_file(path, file_type="image"):
     """Track a created file with metadata for later deletion."""
-    CREATED_FILES.append({
+    track_files([(path, file_type)])
+
+def track_files(entries):
+    """Track several created files at once from (path, file_type) pairs sharing one timestamp."""
+    timestamp = datetime.now().isoformat()
+    CREATED_FILES.extend({
         'path': path,
         'type': file_type,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': timestamp,
         'version': VERSION
-    })
+    } for path, file_type in entries)
 
 def get_tracked_files_by_type(file_type=None):
     """Get tracked files, optionally filtered by type."""
@@ -252,13 +339,42 @@ def get_tracked_files_by_type(file_type=None):
 #                         GCS FUNCTIONS (CLOUD/GROUP MODES)
 # ============================================================================
 
+# Cached GCS handles - creating a storage.Client per call costs an auth refresh
+# and a fresh HTTP connection pool, so one client is shared for the whole run.
+_GCS_CLIENT = None
+_GCS_BUCKETS = {}                # bucket_name -> storage.Bucket
+
+
+def _gcs_http_session():
+    """
+    Authorized HTTP session with a keep-alive pool of GCS_HTTP_POOL connections.
+    
+    The default requests pool holds 10 connections, fewer than DOWNLOAD_WORKERS,
+    so concurrent downloads would keep discarding and re-handshaking TLS.
+    """
+    import google.auth
+    import requests
+    from google.auth.transport.requests import AuthorizedSession
+    
+    credentials, project = google.auth.default()
+    session = AuthorizedSession(credentials)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=GCS_HTTP_POOL, pool_maxsize=GCS_HTTP_POOL)
+    session.mount("https://", adapter)
+    return session, project
+
+
 def get_gcs_client():
-    """Get authenticated GCS client."""
+    """Get authenticated GCS client (created once, then reused)."""
+    global _GCS_CLIENT
     if MODE == "KAGGLE":
         return None
+    if _GCS_CLIENT is not None:
+        return _GCS_CLIENT
     try:
         from google.cloud import storage
-        return storage.Client()
+        session, project = _gcs_http_session()
+        _GCS_CLIENT = storage.Client(project=project, _http=session)
+        return _GCS_CLIENT
     except ImportError:
         print("Warning: google-cloud-storage not installed")
         print("Run: pip install google-cloud-storage")
@@ -268,15 +384,24 @@ def get_gcs_client():
         return None
 
 
-def list_gcs_images(bucket_name, folder, prefix_filter=None, limit=None):
-    """List images in GCS bucket, optionally filtered by prefix."""
+def get_gcs_bucket(bucket_name):
+    """Get a cached Bucket handle (None if GCS is unavailable)."""
     client = get_gcs_client()
     if not client:
-        return []
-    
-    bucket = client.bucket(bucket_name)
+        return None
+    bucket = _GCS_BUCKETS.get(bucket_name)
+    if bucket is None:
+        bucket = _GCS_BUCKETS[bucket_name] = client.bucket(bucket_name)
+    return bucket
+
+
+def list_gcs_images(bucket_name, folder, prefix_filter=None, limit=None):
+    """Yield image blob paths in GCS bucket, optionally filtered by prefix."""
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
+        return
     
-    images = []
+    found = 0
     
     # If prefix filter specified, search in each prefix's subfolder
     if prefix_filter:
@@ -285,7 +410,8 @@ def list_gcs_images(bucket_name, folder, prefix_filter=None, limit=None):
             search_path = f"{folder}/{prefix}/" if folder else f"{prefix}/"
             print(f"  Searching: {search_path}")
             
-            blobs = bucket.list_blobs(prefix=search_path)
+            blobs = bucket.list_blobs(prefix=search_path, page_size=GCS_LIST_PAGE_SIZE,
+                                      fields=GCS_NAME_FIELDS)
             for blob in blobs:
                 name = blob.name
                 basename = os.path.basename(name).lower()
@@ -295,14 +421,16 @@ def list_gcs_images(bucket_name, folder, prefix_filter=None, limit=None):
                     continue
                 
                 # Check file extension
-                if basename.endswith('.png') or basename.endswith('.jpg') or basename.endswith('.jpeg'):
-                    images.append(blob.name)
-                    if limit and len(images) >= limit:
-                        return images
+                if basename.endswith(IMAGE_EXTENSIONS):
+                    yield blob.name
+                    found += 1
+                    if limit and found >= limit:
+                        return
     else:
         # No filter - list all images in folder
         search_path = f"{folder}/" if folder else ""
-        blobs = bucket.list_blobs(prefix=search_path)
+        blobs = bucket.list_blobs(prefix=search_path, page_size=GCS_LIST_PAGE_SIZE,
+                                  fields=GCS_NAME_FIELDS)
         
         for blob in blobs:
             name = blob.name
@@ -315,75 +443,110 @@ def list_gcs_images(bucket_name, folder, prefix_filter=None, limit=None):
                 continue
             
             # Check file extension
-            if basename.endswith('.png') or basename.endswith('.jpg') or basename.endswith('.jpeg'):
-                images.append(blob.name)
-                if limit and len(images) >= limit:
-                    break
-    
-    return images
+            if basename.endswith(IMAGE_EXTENSIONS):
+                yield blob.name
+                found += 1
+                if limit and found >= limit:
+                    return
 
 
 def download_from_gcs(bucket_name, blob_path, local_path):
     """Download a file from GCS."""
     import time
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return False
     
     try:
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_path)
-        
-        # Get file size for progress
-        blob.reload()
-        size_mb = blob.size / (1024 * 1024) if blob.size else 0
+        blob = bucket.blob(blob_path, chunk_size=GCS_CHUNK_SIZE)
         
-        print(f"  Downloading ({size_mb:.1f} MB)...", end=" ", flush=True)
         t0 = time.time()
         blob.download_to_filename(local_path)
         elapsed = time.time() - t0
+        
+        # Size from the written file - saves a metadata request per image
+        size_mb = os.path.getsize(local_path) / (1024 * 1024)
         speed = size_mb / elapsed if elapsed > 0 else 0
-        print(f"OK ({elapsed:.1f}s, {speed:.1f} MB/s)")
+        logger.info(f"  Downloaded {os.path.basename(blob_path)} ({size_mb:.1f} MB, {elapsed:.1f}s, {speed:.1f} MB/s)")
         return True
     except Exception as e:
-        print(f"FAILED: {e}")
+        logger.error(f"  Download FAILED for {blob_path}: {e}")
         return False
 
 
+def download_bytes_from_gcs(bucket_name, blob_path):
+    """Download a GCS object into memory. Returns bytes or None."""
+    import time
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
+        return None
+    
+    try:
+        blob = bucket.blob(blob_path, chunk_size=GCS_CHUNK_SIZE)
+        
+        t0 = time.time()
+        data = blob.download_as_bytes()
+        elapsed = time.time() - t0
+        
+        size_mb = len(data) / (1024 * 1024)
+        speed = size_mb / elapsed if elapsed > 0 else 0
+        logger.info(f"  Downloaded {os.path.basename(blob_path)} ({size_mb:.1f} MB, {elapsed:.1f}s, {speed:.1f} MB/s)")
+        return data
+    except Exception as e:
+        logger.error(f"  Download FAILED for {blob_path}: {e}")
+        return None
+
+
 def upload_to_gcs(local_path, bucket_name, blob_path, file_type="image"):
     """Upload a file to GCS and track it."""
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return None
     
     try:
-        bucket = client.bucket(bucket_name)
         blob = bucket.blob(blob_path)
         blob.upload_from_filename(local_path)
         track_file(blob_path, file_type)
         return f"gs://{bucket_name}/{blob_path}"
     except Exception as e:
-        print(f"Error uploading to {blob_path}: {e}")
+        logger.error(f"Error uploading to {blob_path}: {e}")
         return None
 
 
+def _skip_upload(local_path, bucket_name, blob_path, file_type="image"):
+    """Uploader used outside CLOUD/GROUP modes - nothing is uploaded."""
+    return None
+
+
 def delete_from_gcs(bucket_name, blob_paths):
-    """Delete files from GCS."""
-    client = get_gcs_client()
-    if not client:
+    """Delete files from GCS, up to GCS_DELETE_BATCH objects per HTTP request."""
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return []
+    client = get_gcs_client()
     
-    bucket = client.bucket(bucket_name)
+    paths = [p['path'] if isinstance(p, dict) else p for p in blob_paths]
     deleted = []
     
-    for blob_path in blob_paths:
+    for start in range(0, len(paths), GCS_DELETE_BATCH):
+        chunk = paths[start:start + GCS_DELETE_BATCH]
         try:
-            path = blob_path['path'] if isinstance(blob_path, dict) else blob_path
-            blob = bucket.blob(path)
-            blob.delete()
-            deleted.append(path)
-        except Exception as e:
-            print(f"Error deleting {blob_path}: {e}")
+            with client.batch():
+                for path in chunk:
+                    bucket.blob(path).delete()
+            deleted.extend(chunk)
+        except Exception:
+            # A batch only reports its first failure - retry the chunk one by one.
+            # NotFound here means the batch already removed it (or it never existed).
+            from google.api_core.exceptions import NotFound
+            for path in chunk:
+                try:
+                    bucket.blob(path).delete()
+                    deleted.append(path)
+                except NotFound:
+                    deleted.append(path)
+                except Exception as e:
+                    print(f"Error deleting {path}: {e}")
     
     return deleted
 
@@ -398,11 +561,10 @@ def delete_old_version_folders():
                 shutil.rmtree(item_path)
                 print(f"Deleted old version folder: {item}")
     else:
-        client = get_gcs_client()
-        if not client:
+        bucket = get_gcs_bucket(GCS_BUCKET)
+        if bucket is None:
             return
         
-        bucket = client.bucket(GCS_BUCKET)
         for version_num in range(1, 20):
             if f"v{version_num}" == VERSION:
                 continue
@@ -417,6 +579,22 @@ def delete_old_version_folders():
 #                   COLOR DETECTION (STEP 1: Monotone Check)
 # ============================================================================
 
+def analyze_image(image_bgr):
+    """
+    STEPS 1+2: Color composition and grid spacing in one pass.
+    
+    Converts the image to HSV and grayscale once and feeds both analyses
+    from the shared full-resolution arrays, instead of each step re-reading
+    the full BGR image. Both stay at full resolution: ECG traces and grid
+    lines are only 1-4 px wide, and downscaling blends them into the paper.
+    
+    Returns (color_info, grid_info).
+    """
+    hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    return _color_composition(hsv, gray), _grid_spacing(hsv)
+
+
 def detect_color_composition(image_bgr):
     """
     STEP 1: Detect if image has both red and black or is monotone.
@@ -431,8 +609,12 @@ def detect_color_composition(image_bgr):
     """
     hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
     gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    
-    total_pixels = image_bgr.shape[0] * image_bgr.shape[1]
+    return _color_composition(hsv, gray)
+
+
+def _color_composition(hsv, gray):
+    """Color composition from precomputed HSV and grayscale arrays."""
+    total_pixels = gray.shape[0] * gray.shape[1]
     
     # Detect RED pixels (grid)
     lower_red1 = np.array([0, 50, 50])
@@ -450,19 +632,19 @@ def detect_color_composition(image_bgr):
     pink_mask = cv2.inRange(hsv, lower_pink, upper_pink)
     
     red_total_mask = cv2.bitwise_or(red_mask, pink_mask)
-    red_pixels = np.sum(red_total_mask > 0)
+    red_pixels = np.count_nonzero(red_total_mask)
     red_percent = (red_pixels / total_pixels) * 100
     
     # Detect BLACK pixels (ECG traces)
     black_mask = gray < 80  # Dark pixels
     # Exclude red pixels from black count
     black_only_mask = black_mask & (red_total_mask == 0)
-    black_pixels = np.sum(black_only_mask)
+    black_pixels = np.count_nonzero(black_only_mask)
     black_percent = (black_pixels / total_pixels) * 100
     
     # Detect WHITE/PAPER pixels
     white_mask = gray > 200
-    white_pixels = np.sum(white_mask)
+    white_pixels = np.count_nonzero(white_mask)
     white_percent = (white_pixels / total_pixels) * 100
     
     # Determine color presence
@@ -507,11 +689,12 @@ def detect_grid_spacing(image_bgr):
     - estimated_dpi: based on 1mm = detected pixels
     - confidence: how confident we are in the detection
     """
-    # Convert to grayscale
-    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    
+    return _grid_spacing(cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV))
+
+
+def _grid_spacing(hsv):
+    """Grid spacing detection from a precomputed HSV array."""
     # Detect red grid lines using color
-    hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
     lower_red1 = np.array([0, 30, 30])
     upper_red1 = np.array([15, 255, 255])
     lower_red2 = np.array([165, 30, 30])
@@ -549,7 +732,6 @@ def detect_grid_spacing(image_bgr):
             return None, peaks
         
         # Find most common spacing (small squares)
-        from collections import Counter
         spacing_counts = Counter([round(s, -1) for s in spacings])  # Round to nearest 10
         if spacing_counts:
             most_common = spacing_counts.most_common(1)[0][0]
@@ -638,14 +820,17 @@ def validate_calibration(grid_info, image_shape):
 #                   ANALYSIS MARKDOWN GENERATOR
 # ============================================================================
 
-def generate_analysis_md(filename, color_info, grid_info, calibration_info, processing_results):
+def write_analysis_md(f, filename, color_info, grid_info, calibration_info, processing_results):
     """
-    Generate a markdown analysis file for the image.
+    Write the markdown analysis report for the image to an open text file.
+    
+    Sections are written as they are built so the full report never has to
+    be assembled as one string in memory.
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     base_name = os.path.splitext(filename)[0]
     
-    md_content = f"""# ECG Image Analysis Report
+    f.write(f"""# ECG Image Analysis Report
 
 **File:** `{filename}`  
 **Generated:** {timestamp}  
@@ -704,52 +889,52 @@ def generate_analysis_md(filename, color_info, grid_info, calibration_info, proc
 
 ### Validation Results
 
-"""
+""")
     
     if calibration_info['validations']:
-        md_content += "**Passed:**\n"
+        f.write("**Passed:**\n")
         for v in calibration_info['validations']:
-            md_content += f"- {v}\n"
+            f.write(f"- {v}\n")
     
     if calibration_info['warnings']:
-        md_content += "\n**Warnings:**\n"
+        f.write("\n**Warnings:**\n")
         for w in calibration_info['warnings']:
-            md_content += f"- {w}\n"
+            f.write(f"- {w}\n")
     
-    md_content += f"""
+    f.write(f"""
 ---
 
 ## 4. Processing Results
 
-"""
+""")
     
     if color_info['is_monotone']:
-        md_content += """
+        f.write("""
 > **MONOTONE IMAGE DETECTED**
 > 
 > This image does not contain both red grid and black ECG traces.
 > Color separation was not performed.
 
-"""
+""")
     else:
-        md_content += "### Method Comparison\n\n"
-        md_content += "| Method | BLACK Score | RED Score | Notes |\n"
-        md_content += "|--------|-------------|-----------|-------|\n"
+        f.write("### Method Comparison\n\n")
+        f.write("| Method | BLACK Score | RED Score | Notes |\n")
+        f.write("|--------|-------------|-----------|-------|\n")
         
         for method, data in processing_results.get('methods', {}).items():
             black_score = data.get('black_score', 'N/A')
             red_score = data.get('red_score', 'N/A')
-            md_content += f"| {method} | {black_score:,} | {red_score} | |\n"
+            f.write(f"| {method} | {black_score:,} | {red_score} | |\n")
         
         if 'keeper_black' in processing_results:
             kb = processing_results['keeper_black']
-            md_content += f"\n**Best BLACK:** {kb['method']} (score: {kb['score']:,})\n"
+            f.write(f"\n**Best BLACK:** {kb['method']} (score: {kb['score']:,})\n")
         
         if 'keeper_red' in processing_results:
             kr = processing_results['keeper_red']
-            md_content += f"**Best RED:** {kr['method']} (score: {kr['score']})\n"
+            f.write(f"**Best RED:** {kr['method']} (score: {kr['score']})\n")
     
-    md_content += f"""
+    f.write(f"""
 ---
 
 ## 5. Output Files
@@ -757,16 +942,16 @@ def generate_analysis_md(filename, color_info, grid_info, calibration_info, proc
 | File Type | Filename |
 |-----------|----------|
 | Original | `{base_name}--original.png` |
-"""
+""")
     
-    for f in processing_results.get('local_files', []):
-        fname = os.path.basename(f)
+    for path in processing_results.get('local_files', []):
+        fname = os.path.basename(path)
         if '--sk-' in fname:
-            md_content += f"| **KEEPER** | `{fname}` |\n"
+            f.write(f"| **KEEPER** | `{fname}` |\n")
         elif '--s-' in fname:
-            md_content += f"| Processed | `{fname}` |\n"
+            f.write(f"| Processed | `{fname}` |\n")
     
-    md_content += f"""
+    f.write(f"""
 ---
 
 ## 6. Interpretation Guide
@@ -788,9 +973,7 @@ def generate_analysis_md(filename, color_info, grid_info, calibration_info, proc
 ---
 
 *Report generated by ECG Color Processor {VERSION}*
-"""
-    
-    return md_content
+""")
 
 # ============================================================================
 #                         IMAGE PROCESSING FUNCTIONS
@@ -813,25 +996,21 @@ def detect_text_regions(image_bgr):
     text_mask = cv2.bitwise_or(horizontal, vertical)
     
     num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
-    text_regions = np.zeros_like(gray)
     
     img_h, img_w = gray.shape
     
-    for i in range(1, num_labels):
-        x, y, w, h, area = stats[i]
-        aspect_ratio = w / max(h, 1)
-        is_text = False
-        
-        if area < 5000 and area > 50:
-            if aspect_ratio > 2 or aspect_ratio < 0.5:
-                is_text = True
-            if y < img_h * 0.15 or y > img_h * 0.85:
-                is_text = True
-            if x < img_w * 0.1 or x > img_w * 0.9:
-                is_text = True
-        
-        if is_text:
-            text_regions[labels == i] = 255
+    # Classify every component at once, then paint them with a label lookup
+    # table (one pass over the image instead of one pass per component)
+    x, y, w, h, area = stats[1:].T
+    aspect_ratio = w / np.maximum(h, 1)
+    is_text = ((area < 5000) & (area > 50) &
+               ((aspect_ratio > 2) | (aspect_ratio < 0.5) |
+                (y < img_h * 0.15) | (y > img_h * 0.85) |
+                (x < img_w * 0.1) | (x > img_w * 0.9)))
+    
+    label_lut = np.zeros(num_labels, dtype=np.uint8)
+    label_lut[1:][is_text] = 255
+    text_regions = label_lut[labels]
     
     final_text_mask = cv2.bitwise_or(text_mask, text_regions)
     kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
@@ -843,7 +1022,7 @@ def detect_text_regions(image_bgr):
 def calculate_red_quality_score(image_bgr):
     """RED score: % black pixels × 1000 (LOWER = better)"""
     gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    black_pixels = np.sum(gray < 50)
+    black_pixels = np.count_nonzero(gray < 50)
     total_pixels = gray.size
     return int((black_pixels / total_pixels) * 100 * 1000)
 
@@ -851,13 +1030,14 @@ def calculate_red_quality_score(image_bgr):
 def calculate_black_quality_score(image_bgr):
     """BLACK score: total black pixels (HIGHER = better)"""
     gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    return int(np.sum(gray < 50))
+    return int(np.count_nonzero(gray < 50))
 
 
 # ----- OPENCV METHOD -----
-def isolate_ecg_opencv(image_bgr, remove_text=True):
+def isolate_ecg_opencv(image_bgr, remove_text=True, hsv=None, text_mask=None):
     """Remove red grid using OpenCV HSV, keep black ECG traces."""
-    hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
+    if hsv is None:
+        hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
     
     lower_red1 = np.array([0, 50, 50])
     upper_red1 = np.array([10, 255, 255])
@@ -885,15 +1065,17 @@ def isolate_ecg_opencv(image_bgr, remove_text=True):
     result_bgr = cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
     
     if remove_text and REMOVE_TEXT:
-        text_mask = detect_text_regions(image_bgr)
+        if text_mask is None:
+            text_mask = detect_text_regions(image_bgr)
         result_bgr[text_mask > 0] = [255, 255, 255]
     
-    return result_bgr, int(np.sum(non_grid_dark))
+    return result_bgr, int(np.count_nonzero(non_grid_dark))
 
 
-def isolate_grid_opencv(image_bgr):
+def isolate_grid_opencv(image_bgr, hsv=None):
     """Remove black ECG traces, keep red grid only."""
-    hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
+    if hsv is None:
+        hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
     
     lower_red1 = np.array([0, 30, 30])
     upper_red1 = np.array([15, 255, 255])
@@ -913,11 +1095,11 @@ def isolate_grid_opencv(image_bgr):
     result = np.ones_like(image_bgr) * 255
     result[grid_mask > 0] = image_bgr[grid_mask > 0]
     
-    return result, int(np.sum(grid_mask > 0))
+    return result, int(np.count_nonzero(grid_mask))
 
 
 # ----- PILLOW METHOD -----
-def isolate_ecg_pillow(image_bgr, remove_text=True):
+def isolate_ecg_pillow(image_bgr, remove_text=True, text_mask=None):
     """Remove red grid using Pillow channel splitting."""
     rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
     pil_image = Image.fromarray(rgb)
@@ -940,10 +1122,11 @@ def isolate_ecg_pillow(image_bgr, remove_text=True):
     result_bgr = cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
     
     if remove_text and REMOVE_TEXT:
-        text_mask = detect_text_regions(image_bgr)
+        if text_mask is None:
+            text_mask = detect_text_regions(image_bgr)
         result_bgr[text_mask > 0] = [255, 255, 255]
     
-    return result_bgr, int(np.sum(keep_mask))
+    return result_bgr, int(np.count_nonzero(keep_mask))
 
 
 def isolate_grid_pillow(image_bgr):
@@ -963,30 +1146,125 @@ def isolate_grid_pillow(image_bgr):
     result = np.ones_like(image_bgr) * 255
     result[grid_mask] = image_bgr[grid_mask]
     
-    return result, int(np.sum(grid_mask))
+    return result, int(np.count_nonzero(grid_mask))
+
+
+def method_inputs(image_bgr):
+    """
+    Per-image inputs shared by all separation methods: (hsv, text_mask).
+    
+    The opencv isolators both need HSV and both ECG isolators need the text
+    mask, so these are computed once per image instead of once per call.
+    """
+    hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
+    text_mask = detect_text_regions(image_bgr) if REMOVE_TEXT else None
+    return hsv, text_mask
+
+
+def _run_method(method, image, hsv=None, text_mask=None):
+    """
+    Run one separation method and score it.
+    
+    Returns (ecg_img, ecg_pixels, grid_img, grid_pixels, black_score, red_score,
+    elapsed) or None for an unknown method.
+    """
+    import time
+    t0 = time.time()
+    if method == 'opencv':
+        ecg_img, ecg_pixels = isolate_ecg_opencv(image, hsv=hsv, text_mask=text_mask)
+        grid_img, grid_pixels = isolate_grid_opencv(image, hsv=hsv)
+    elif method == 'pillow':
+        ecg_img, ecg_pixels = isolate_ecg_pillow(image, text_mask=text_mask)
+        grid_img, grid_pixels = isolate_grid_pillow(image)
+    else:
+        return None
+    
+    black_score = calculate_black_quality_score(ecg_img)
+    red_score = calculate_red_quality_score(grid_img)
+    return ecg_img, ecg_pixels, grid_img, grid_pixels, black_score, red_score, time.time() - t0
 
 
 # ============================================================================
 #                         FILENAME GENERATION
 # ============================================================================
 
-def generate_output_filename(original_filename, method, color_type, score, is_keeper=False):
+# The generators below take the image's base name (no directory, no
+# extension), which callers compute once per image, rather than re-splitting
+# the original filename for every output file.
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def save_original(original_path, image, source_path=None, source_bytes=None):
+    """
+    Write the --original.png copy.
+    
+    A PNG source is already in the output format, so its bytes are copied
+    as-is instead of being re-encoded from the decoded array; other formats
+    fall back to cv2.imwrite.
+    """
+    try:
+        if source_bytes is not None and source_bytes[:8] == PNG_SIGNATURE:
+            with open(original_path, 'wb') as f:
+                f.write(source_bytes)
+            return
+        if source_path and source_path.lower().endswith('.png'):
+            shutil.copyfile(source_path, original_path)
+            return
+    except OSError:
+        pass
+    cv2.imwrite(original_path, image, PNG_PARAMS)
+
+
+def keep_best(best, method, score, image, higher_is_better):
+    """
+    Running keeper selection over the method loop.
+    
+    Returns the best-so-far (method, score, image), so only the winning
+    image is held and every other method's output can be freed as soon as
+    it is written. The first method wins ties.
+    """
+    if best is None or (score > best[1] if higher_is_better else score < best[1]):
+        return method, score, image
+    return best
+
+
+def save_keeper(keeper_path, image, source_path=None):
+    """
+    Write a keeper image.
+    
+    A keeper is always one of the per-method outputs, so when that output was
+    already encoded to source_path it is hard-linked (or copied) instead of
+    PNG-encoding the same array a second time.
+    """
+    if source_path:
+        try:
+            os.link(source_path, keeper_path)
+            return
+        except OSError:
+            pass
+        try:
+            shutil.copyfile(source_path, keeper_path)
+            return
+        except OSError:
+            pass
+    cv2.imwrite(keeper_path, image, PNG_PARAMS)
+
+
+def generate_output_filename(base_name, method, color_type, score, is_keeper=False):
     """Generate output filename."""
-    base = os.path.splitext(os.path.basename(original_filename))[0]
     prefix = "--sk-" if is_keeper else "--s-"
-    return f"{base}{prefix}{VERSION}-{method}-{color_type}-{score}.png"
+    return f"{base_name}{prefix}{VERSION}-{method}-{color_type}-{score}.png"
 
 
-def generate_original_filename(original_filename):
+def generate_original_filename(base_name):
     """Generate filename for original image copy."""
-    base = os.path.splitext(os.path.basename(original_filename))[0]
-    return f"{base}--original.png"
+    return f"{base_name}--original.png"
 
 
-def generate_analysis_filename(original_filename):
+def generate_analysis_filename(base_name):
     """Generate filename for analysis markdown."""
-    base = os.path.splitext(os.path.basename(original_filename))[0]
-    return f"{base}--analysis-{VERSION}.md"
+    return f"{base_name}--analysis-{VERSION}.md"
 
 
 # ============================================================================
@@ -1001,8 +1279,23 @@ def process_single_image(image_path_or_gcs, output_dir=None):
     if output_dir is None:
         output_dir = LOCAL_TEMP
     
+    # Output prefixes are built once; each output path is a plain concatenation
+    out_prefix = os.path.join(output_dir, "")
+    gcs_prefix = GCS_OUTPUT_FOLDER + "/"
+    
+    # Pick the uploader once per image instead of re-checking MODE per file
+    uploader = upload_to_gcs if MODE in CLOUD_MODES else _skip_upload
+    
+    def publish(local_file, output_filename, file_type):
+        """Upload an output file (cloud modes) and record its GCS path."""
+        gcs_path = gcs_prefix + output_filename
+        if uploader(local_file, GCS_BUCKET, gcs_path, file_type):
+            results['uploaded_files'].append(gcs_path)
+            return gcs_path
+        return None
+    
     # Load image
-    if MODE in ["CLOUD", "GROUP"] and image_path_or_gcs.startswith(GCS_SOURCE_FOLDER):
+    if MODE in CLOUD_MODES and image_path_or_gcs.startswith(GCS_SOURCE_FOLDER):
         local_path = os.path.join(LOCAL_TEMP, filename)
         if not download_from_gcs(GCS_BUCKET, image_path_or_gcs, local_path):
             return None
@@ -1012,29 +1305,25 @@ def process_single_image(image_path_or_gcs, output_dir=None):
         local_path = image_path_or_gcs
     
     if image is None:
-        print(f"  Error: Could not read image: {filename}")
+        logger.error(f"  Error: Could not read image: {filename}")
         return None
     
-    print(f"  Image size: {image.shape[1]}x{image.shape[0]}")
-    
-    # ===== STEP 1: COLOR COMPOSITION CHECK =====
-    print(f"  Step 1: Checking color composition...")
-    color_info = detect_color_composition(image)
-    print(f"    Verdict: {color_info['color_verdict']}")
-    print(f"    Red: {color_info['red_percent']:.1f}% | Black: {color_info['black_percent']:.1f}%")
+    logger.info(f"  Image size: {image.shape[1]}x{image.shape[0]}")
     
-    # ===== STEP 2: GRID CALIBRATION DETECTION =====
-    print(f"  Step 2: Detecting grid calibration...")
-    grid_info = detect_grid_spacing(image)
-    print(f"    Small square: {grid_info['detected_small_square_px']} px")
-    print(f"    Estimated DPI: {grid_info['estimated_dpi']}")
-    print(f"    Confidence: {grid_info['confidence']}")
+    # ===== STEPS 1+2: COLOR COMPOSITION + GRID CALIBRATION (shared pass) =====
+    logger.info(f"  Steps 1-2: Checking color composition and grid calibration...")
+    color_info, grid_info = analyze_image(image)
+    logger.info(f"    Verdict: {color_info['color_verdict']}")
+    logger.info(f"    Red: {color_info['red_percent']:.1f}% | Black: {color_info['black_percent']:.1f}%")
+    logger.info(f"    Small square: {grid_info['detected_small_square_px']} px")
+    logger.info(f"    Estimated DPI: {grid_info['estimated_dpi']}")
+    logger.info(f"    Confidence: {grid_info['confidence']}")
     
     # ===== STEP 3: VALIDATE CALIBRATION =====
     calibration_info = validate_calibration(grid_info, image.shape)
     if calibration_info['warnings']:
         for w in calibration_info['warnings']:
-            print(f"    Warning: {w}")
+            logger.warning(f"    Warning: {w}")
     
     # Initialize results
     results = {
@@ -1052,143 +1341,108 @@ def process_single_image(image_path_or_gcs, output_dir=None):
     
     # Save original for comparison
     if SAVE_ORIGINALS:
-        original_filename = generate_original_filename(filename)
-        original_local = os.path.join(output_dir, original_filename)
-        cv2.imwrite(original_local, image)
+        original_filename = generate_original_filename(base_name)
+        original_local = out_prefix + original_filename
+        save_original(original_local, image, source_path=local_path)
         results['local_files'].append(original_local)
-        
-        if MODE in ["CLOUD", "GROUP"]:
-            original_gcs = f"{GCS_OUTPUT_FOLDER}/{original_filename}"
-            upload_to_gcs(original_local, GCS_BUCKET, original_gcs, "original")
-            results['uploaded_files'].append(original_gcs)
+        publish(original_local, original_filename, "original")
     
     # ===== STEP 4: COLOR SEPARATION (if not monotone) =====
     if color_info['is_monotone']:
-        print(f"  Step 4: SKIPPED - Image is monotone, no color separation needed")
+        logger.info(f"  Step 4: SKIPPED - Image is monotone, no color separation needed")
     else:
-        print(f"  Step 4: Processing color separation...")
+        logger.info(f"  Step 4: Processing color separation...")
+        hsv, text_mask = method_inputs(image)
+        best_black = best_red = None    # running keepers: (method, score, image)
         
         for method in METHODS:
-            print(f"    Method: {method}")
+            logger.info(f"    Method: {method}")
             
-            if method == 'opencv':
-                ecg_func = isolate_ecg_opencv
-                grid_func = isolate_grid_opencv
-            elif method == 'pillow':
-                ecg_func = isolate_ecg_pillow
-                grid_func = isolate_grid_pillow
-            else:
+            outcome = _run_method(method, image, hsv, text_mask)
+            if outcome is None:
                 continue
-            
-            # Process ECG (black)
-            ecg_img, ecg_pixels = ecg_func(image)
-            black_score = calculate_black_quality_score(ecg_img)
+            ecg_img, ecg_pixels, grid_img, grid_pixels, black_score, red_score, _ = outcome
             results['black_scores'][method] = black_score
-            
-            # Process Grid (red)
-            grid_img, grid_pixels = grid_func(image)
-            red_score = calculate_red_quality_score(grid_img)
             results['red_scores'][method] = red_score
             
-            print(f"      BLACK: {black_score:,} pixels | RED: {red_score} contamination")
+            logger.info(f"      BLACK: {black_score:,} pixels | RED: {red_score} contamination")
             
             results['methods'][method] = {
                 'ecg_pixels': ecg_pixels,
                 'grid_pixels': grid_pixels,
                 'black_score': black_score,
-                'red_score': red_score,
-                'ecg_img': ecg_img,
-                'grid_img': grid_img
+                'red_score': red_score
             }
             
             # Save BLACK image
             if ecg_pixels >= MIN_ECG_PIXELS:
-                black_filename = generate_output_filename(filename, method, 'black', black_score)
-                black_local = os.path.join(output_dir, black_filename)
-                cv2.imwrite(black_local, ecg_img)
+                black_filename = generate_output_filename(base_name, method, 'black', black_score)
+                black_local = out_prefix + black_filename
+                cv2.imwrite(black_local, ecg_img, PNG_PARAMS)
                 results['local_files'].append(black_local)
                 results['methods'][method]['black_path'] = black_local
-                
-                if MODE in ["CLOUD", "GROUP"]:
-                    black_gcs = f"{GCS_OUTPUT_FOLDER}/{black_filename}"
-                    upload_to_gcs(black_local, GCS_BUCKET, black_gcs, "processed")
-                    results['uploaded_files'].append(black_gcs)
+                publish(black_local, black_filename, "processed")
             
             # Save RED image
             if grid_pixels >= MIN_GRID_PIXELS:
-                red_filename = generate_output_filename(filename, method, 'red', red_score)
-                red_local = os.path.join(output_dir, red_filename)
-                cv2.imwrite(red_local, grid_img)
+                red_filename = generate_output_filename(base_name, method, 'red', red_score)
+                red_local = out_prefix + red_filename
+                cv2.imwrite(red_local, grid_img, PNG_PARAMS)
                 results['local_files'].append(red_local)
                 results['methods'][method]['red_path'] = red_local
-                
-                if MODE in ["CLOUD", "GROUP"]:
-                    red_gcs = f"{GCS_OUTPUT_FOLDER}/{red_filename}"
-                    upload_to_gcs(red_local, GCS_BUCKET, red_gcs, "processed")
-                    results['uploaded_files'].append(red_gcs)
+                publish(red_local, red_filename, "processed")
+            
+            # Hold on to this method's outputs only while they are the best so far
+            best_black = keep_best(best_black, method, black_score, ecg_img, higher_is_better=True)
+            best_red = keep_best(best_red, method, red_score, grid_img, higher_is_better=False)
+            del outcome, ecg_img, grid_img
+        
+        # Source image and its shared HSV/text mask are no longer needed -
+        # keepers reuse the best per-method outputs - so release them before
+        # encoding
+        del image, hsv, text_mask
         
-        # Select KEEPERS
-        if results['black_scores']:
-            best_black_method = max(results['black_scores'], key=results['black_scores'].get)
-            best_black_score = results['black_scores'][best_black_method]
-            best_black_img = results['methods'][best_black_method]['ecg_img']
+        # Save KEEPERS
+        if best_black is not None:
+            best_black_method, best_black_score, best_black_img = best_black
             
-            keeper_black_filename = generate_output_filename(filename, best_black_method, 'black', best_black_score, is_keeper=True)
-            keeper_black_local = os.path.join(output_dir, keeper_black_filename)
-            cv2.imwrite(keeper_black_local, best_black_img)
+            keeper_black_filename = generate_output_filename(base_name, best_black_method, 'black', best_black_score, is_keeper=True)
+            keeper_black_local = out_prefix + keeper_black_filename
+            save_keeper(keeper_black_local, best_black_img,
+                        results['methods'][best_black_method].get('black_path'))
             results['local_files'].append(keeper_black_local)
             results['keeper_black'] = {'method': best_black_method, 'score': best_black_score}
-            print(f"    KEEPER BLACK: {best_black_method} (score: {best_black_score:,})")
-            
-            if MODE in ["CLOUD", "GROUP"]:
-                keeper_black_gcs = f"{GCS_OUTPUT_FOLDER}/{keeper_black_filename}"
-                upload_to_gcs(keeper_black_local, GCS_BUCKET, keeper_black_gcs, "keeper")
-                results['uploaded_files'].append(keeper_black_gcs)
+            logger.info(f"    KEEPER BLACK: {best_black_method} (score: {best_black_score:,})")
+            publish(keeper_black_local, keeper_black_filename, "keeper")
         
-        if results['red_scores']:
-            best_red_method = min(results['red_scores'], key=results['red_scores'].get)
-            best_red_score = results['red_scores'][best_red_method]
-            best_red_img = results['methods'][best_red_method]['grid_img']
+        if best_red is not None:
+            best_red_method, best_red_score, best_red_img = best_red
             
-            keeper_red_filename = generate_output_filename(filename, best_red_method, 'red', best_red_score, is_keeper=True)
-            keeper_red_local = os.path.join(output_dir, keeper_red_filename)
-            cv2.imwrite(keeper_red_local, best_red_img)
+            keeper_red_filename = generate_output_filename(base_name, best_red_method, 'red', best_red_score, is_keeper=True)
+            keeper_red_local = out_prefix + keeper_red_filename
+            save_keeper(keeper_red_local, best_red_img,
+                        results['methods'][best_red_method].get('red_path'))
             results['local_files'].append(keeper_red_local)
             results['keeper_red'] = {'method': best_red_method, 'score': best_red_score}
-            print(f"    KEEPER RED: {best_red_method} (score: {best_red_score})")
-            
-            if MODE in ["CLOUD", "GROUP"]:
-                keeper_red_gcs = f"{GCS_OUTPUT_FOLDER}/{keeper_red_filename}"
-                upload_to_gcs(keeper_red_local, GCS_BUCKET, keeper_red_gcs, "keeper")
-                results['uploaded_files'].append(keeper_red_gcs)
+            logger.info(f"    KEEPER RED: {best_red_method} (score: {best_red_score})")
+            publish(keeper_red_local, keeper_red_filename, "keeper")
     
     # ===== STEP 5: GENERATE ANALYSIS MD =====
     if GENERATE_ANALYSIS_MD:
-        print(f"  Step 5: Generating analysis report...")
-        md_content = generate_analysis_md(filename, color_info, grid_info, calibration_info, results)
-        
-        analysis_filename = generate_analysis_filename(filename)
-        analysis_local = os.path.join(output_dir, analysis_filename)
+        logger.info(f"  Step 5: Generating analysis report...")
+        analysis_filename = generate_analysis_filename(base_name)
+        analysis_local = out_prefix + analysis_filename
         
-        with open(analysis_local, 'w', encoding='utf-8') as f:
-            f.write(md_content)
+        with open(analysis_local, 'w', encoding='utf-8', buffering=MD_WRITE_BUFFER) as f:
+            write_analysis_md(f, filename, color_info, grid_info, calibration_info, results)
         
         results['local_files'].append(analysis_local)
         results['analysis_file'] = analysis_local
         
-        if MODE in ["CLOUD", "GROUP"]:
-            analysis_gcs = f"{GCS_OUTPUT_FOLDER}/{analysis_filename}"
-            upload_to_gcs(analysis_local, GCS_BUCKET, analysis_gcs, "analysis")
-            results['uploaded_files'].append(analysis_gcs)
-            print(f"    Uploaded: {analysis_filename}")
-    
-    # Clean up image data
-    for method in results['methods']:
-        if 'ecg_img' in results['methods'][method]:
-            del results['methods'][method]['ecg_img']
-        if 'grid_img' in results['methods'][method]:
-            del results['methods'][method]['grid_img']
+        if publish(analysis_local, analysis_filename, "analysis"):
+            logger.info(f"    Uploaded: {analysis_filename}")
     
+    flush_log()
     return results
 
 
@@ -1223,28 +1477,66 @@ def get_selected_groups():
     return IMAGE_GROUP_PREFIXES
 
 
+# ============================================================================
+#                         WORKER / THREAD SETUP
+# ============================================================================
+# OpenCV parallelizes internally. With several worker processes each one
+# would spin up a full set of OpenCV threads and oversubscribe the cores, so
+# workers are pinned to one thread (in _worker_init) and only a single-process
+# run lets OpenCV use every core.
+
+def configure_threads(num_workers):
+    """Configure OpenCV threading for a run with num_workers processes."""
+    if num_workers <= 1:
+        cv2.setNumThreads(-1)  # Reset to OpenCV's default (all cores)
+
+
+# Settings that can change at runtime (interactive menu) and so must be
+# handed to worker processes explicitly - a spawned worker re-imports this
+# module and would otherwise see the defaults.
+WORKER_SETTINGS = ("MODE", "VERSION", "GCS_BUCKET", "GCS_OUTPUT_FOLDER", "LOCAL_TEMP")
+
+
+def _worker_settings():
+    """Snapshot of WORKER_SETTINGS for _worker_init."""
+    return {name: globals()[name] for name in WORKER_SETTINGS}
+
+
+def _worker_init(settings=None):
+    """ProcessPoolExecutor initializer for batch worker processes."""
+    global _GCS_CLIENT
+    if settings:
+        globals().update(settings)
+    cv2.setNumThreads(1)
+    # numpy is already loaded here, so BLAS env vars would come too late
+    if THREADPOOLCTL_AVAILABLE:
+        threadpool_limits(limits=1, user_api="blas")
+    # A GCS client must not be shared across a fork - each worker builds its own
+    _GCS_CLIENT = None
+    _GCS_BUCKETS.clear()
+
 # ============================================================================
 #                         BATCH PROCESSING
 # ============================================================================
 
 def find_kaggle_images(limit=None):
-    """Find images in Kaggle input path."""
-    images = []
+    """Yield images in Kaggle input path as the directory walk finds them."""
+    found = 0
     train_path = os.path.join(KAGGLE_INPUT_PATH, "train")
     if os.path.exists(train_path):
         for root, dirs, files in os.walk(train_path):
             for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
+                if file.lower().endswith(IMAGE_EXTENSIONS):
                     if '--s-' not in file and '--sk-' not in file:
-                        images.append(os.path.join(root, file))
-                        if limit and len(images) >= limit:
-                            return images
-    return images
+                        yield os.path.join(root, file)
+                        found += 1
+                        if limit and found >= limit:
+                            return
 
 
 def find_local_images(folder, limit=None):
-    """Find images in a local folder."""
-    images = []
+    """Yield images in a local folder."""
+    found = 0
     if not os.path.exists(folder):
         print(f"Warning: Local folder does not exist: {folder}")
         print(f"Creating folder and adding placeholder message...")
@@ -1252,17 +1544,63 @@ def find_local_images(folder, limit=None):
         readme_path = os.path.join(folder, "README.txt")
         with open(readme_path, 'w') as f:
             f.write("Place ECG images (.png, .jpg) in this folder for processing.\n")
-        return []
+        return
     
     for file in os.listdir(folder):
-        if file.lower().endswith(('.png', '.jpg', '.jpeg')):
+        if file.lower().endswith(IMAGE_EXTENSIONS):
             # Skip already processed
             if '--s-' not in file and '--sk-' not in file and '--original' not in file:
-                images.append(os.path.join(folder, file))
-                if limit and len(images) >= limit:
-                    break
+                yield os.path.join(folder, file)
+                found += 1
+                if limit and found >= limit:
+                    return
+
+
+def _process_batch_item(job):
+    """Process one (index, image_path, output_dir) job from _run_batch.
     
-    return images
+    Returns (result, created_files) where created_files are the entries this
+    call added to CREATED_FILES, so a worker process can hand them back.
+    """
+    index, image_path, output_dir = job
+    logger.info(f"\n[{index}] {os.path.basename(image_path)}")
+    flush_log()
+    first_new = len(CREATED_FILES)
+    result = process_single_image(image_path, output_dir)
+    return result, CREATED_FILES[first_new:]
+
+
+def _run_batch(images, output_dir, label):
+    """
+    Process an iterable of image paths (local files or GCS blob paths).
+    
+    Runs in this process when NUM_WORKERS is 1, otherwise fans the images out
+    over a ProcessPoolExecutor. Returns the list of successful results.
+    """
+    configure_threads(NUM_WORKERS)
+    jobs = ((i, path, output_dir) for i, path in enumerate(images, 1))
+    all_results = []
+    found = 0
+    
+    if NUM_WORKERS > 1:
+        with ProcessPoolExecutor(max_workers=NUM_WORKERS, initializer=_worker_init,
+                                 initargs=(_worker_settings(),)) as executor:
+            for found, (result, created) in enumerate(
+                    executor.map(_process_batch_item, jobs, chunksize=4), 1):
+                CREATED_FILES.extend(created)
+                if result:
+                    all_results.append(result)
+    else:
+        for found, job in enumerate(jobs, 1):
+            result, _ = _process_batch_item(job)
+            if result:
+                all_results.append(result)
+    
+    if not found:
+        print("\nNo images found!")
+    else:
+        print(f"\n{label}: {len(all_results)}/{found} images processed")
+    return all_results
 
 
 def process_batch_local():
@@ -1276,22 +1614,10 @@ def process_batch_local():
     # Create output folder
     os.makedirs(LOCAL_OUTPUT_FOLDER, exist_ok=True)
     
-    # Find images
     images = find_local_images(LOCAL_INPUT_FOLDER, limit=TEST_LIMIT)
-    print(f"Found {len(images)} images to process")
-    
-    if not images:
-        print("\nNo images found!")
+    all_results = _run_batch(images, LOCAL_OUTPUT_FOLDER, "LOCAL")
+    if not all_results:
         print(f"Please add ECG images to: {LOCAL_INPUT_FOLDER}")
-        return []
-    
-    all_results = []
-    for i, img_path in enumerate(images):
-        print(f"\n[{i+1}/{len(images)}] {os.path.basename(img_path)}")
-        result = process_single_image(img_path, LOCAL_OUTPUT_FOLDER)
-        if result:
-            all_results.append(result)
-    
     return all_results
 
 
@@ -1304,20 +1630,7 @@ def process_batch_kaggle():
     output_dir = os.path.join(KAGGLE_OUTPUT_PATH, f"{VERSION}_color_split")
     os.makedirs(output_dir, exist_ok=True)
     
-    images = find_kaggle_images(limit=TEST_LIMIT)
-    print(f"Found {len(images)} images to process")
-    
-    if not images:
-        return []
-    
-    all_results = []
-    for i, img_path in enumerate(images):
-        print(f"\n[{i+1}/{len(images)}] {os.path.basename(img_path)}")
-        result = process_single_image(img_path, output_dir)
-        if result:
-            all_results.append(result)
-    
-    return all_results
+    return _run_batch(find_kaggle_images(limit=TEST_LIMIT), output_dir, "KAGGLE")
 
 
 def process_batch_cloud():
@@ -1330,19 +1643,7 @@ def process_batch_cloud():
         delete_old_version_folders()
     
     images = list_gcs_images(GCS_BUCKET, GCS_SOURCE_FOLDER, limit=TEST_LIMIT)
-    print(f"Found {len(images)} images to process")
-    
-    if not images:
-        return []
-    
-    all_results = []
-    for i, gcs_path in enumerate(images):
-        print(f"\n[{i+1}/{len(images)}] {os.path.basename(gcs_path)}")
-        result = process_single_image(gcs_path)
-        if result:
-            all_results.append(result)
-    
-    return all_results
+    return _run_batch(images, None, "CLOUD")
 
 
 def process_batch_group():
@@ -1361,19 +1662,7 @@ def process_batch_group():
     images = list_gcs_images(GCS_BUCKET, GCS_SOURCE_FOLDER, 
                              prefix_filter=set(selected_prefixes), 
                              limit=TEST_LIMIT)
-    print(f"Found {len(images)} images in selected groups")
-    
-    if not images:
-        return []
-    
-    all_results = []
-    for i, gcs_path in enumerate(images):
-        print(f"\n[{i+1}/{len(images)}] {os.path.basename(gcs_path)}")
-        result = process_single_image(gcs_path)
-        if result:
-            all_results.append(result)
-    
-    return all_results
+    return _run_batch(images, None, "GROUP")
 
 
 # ============================================================================
@@ -1381,21 +1670,28 @@ def process_batch_group():
 # ============================================================================
 
 def print_summary(all_results):
-    """Print processing summary."""
+    """
+    Print processing summary.
+    
+    all_results may be any iterable, including a generator of results still
+    being produced: only running counts are kept, never the results.
+    """
+    # Count images, monotone images and grid confidence levels in a single pass
+    total_images = 0
+    monotone_count = 0
+    confidence_counts = Counter()
+    for r in all_results:
+        total_images += 1
+        monotone_count += bool(r['color_info']['is_monotone'])
+        confidence_counts[r['grid_info']['confidence']] += 1
+    color_count = total_images - monotone_count
+    
     print("\n" + "=" * 60)
     print("PROCESSING COMPLETE - SUMMARY")
     print("=" * 60)
     
-    total_images = len(all_results)
-    
-    # Count by type
-    monotone_count = sum(1 for r in all_results if r['color_info']['is_monotone'])
-    color_count = total_images - monotone_count
-    
     # File counts by type
-    file_counts = defaultdict(int)
-    for f in CREATED_FILES:
-        file_counts[f['type']] += 1
+    file_counts = Counter(f['type'] for f in CREATED_FILES)
     
     print(f"Images processed: {total_images}")
     print(f"  - Color (red+black): {color_count}")
@@ -1406,20 +1702,21 @@ def print_summary(all_results):
     print(f"  - TOTAL: {len(CREATED_FILES)}")
     
     # Calibration summary
-    high_conf = sum(1 for r in all_results if r['grid_info']['confidence'] == 'HIGH')
-    med_conf = sum(1 for r in all_results if r['grid_info']['confidence'] == 'MEDIUM')
-    low_conf = sum(1 for r in all_results if r['grid_info']['confidence'] == 'LOW')
-    
     print(f"\nGrid detection confidence:")
-    print(f"  - HIGH: {high_conf}")
-    print(f"  - MEDIUM: {med_conf}")
-    print(f"  - LOW: {low_conf}")
+    print(f"  - HIGH: {confidence_counts['HIGH']}")
+    print(f"  - MEDIUM: {confidence_counts['MEDIUM']}")
+    print(f"  - LOW: {confidence_counts['LOW']}")
     
+    return _summary(total_images, color_count, monotone_count)
+
+
+def _summary(total_images=0, color_count=0, monotone_count=0):
+    """Summary dict returned by print_summary (all zeros when nothing ran)"""
     return {
         'total_images': total_images,
         'color_images': color_count,
         'monotone_images': monotone_count,
-        'files_by_type': dict(file_counts),
+        'files_by_type': dict(Counter(f['type'] for f in CREATED_FILES)),
         'total_files': len(CREATED_FILES)
     }
 
@@ -1434,12 +1731,16 @@ def save_session_manifest():
     }
     
     manifest_path = os.path.join(LOCAL_TEMP, f'session_manifest_{VERSION}.json')
-    with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+    if ORJSON_AVAILABLE:
+        with open(manifest_path, 'wb') as f:
+            f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
     
     print(f"\nSession manifest saved: {manifest_path}")
     
-    if MODE in ["CLOUD", "GROUP"]:
+    if MODE in CLOUD_MODES:
         manifest_gcs = f"{GCS_OUTPUT_FOLDER}/session_manifest_{VERSION}.json"
         upload_to_gcs(manifest_path, GCS_BUCKET, manifest_gcs, "manifest")
         print(f"Uploaded to: gs://{GCS_BUCKET}/{manifest_gcs}")
@@ -1453,7 +1754,7 @@ def save_session_manifest():
 
 def delete_all_created():
     """Delete all files created in this session."""
-    if MODE in ["CLOUD", "GROUP"] and CREATED_FILES:
+    if MODE in CLOUD_MODES and CREATED_FILES:
         paths = [f['path'] for f in CREATED_FILES]
         print(f"\nDeleting {len(paths)} created files...")
         deleted = delete_from_gcs(GCS_BUCKET, paths)
@@ -1476,19 +1777,21 @@ def delete_local_files(del_type):
         print("Output folder does not exist.")
         return
     
-    files_to_delete = []
+    version_tag = f'--{VERSION}'
+    analysis_tag = f'--analysis-{VERSION}'
+    matchers = {
+        'a': lambda f: version_tag in f or analysis_tag in f,
+        'p': lambda f: '--s-' in f and '--sk-' not in f,
+        'k': lambda f: '--sk-' in f,
+        'm': lambda f: f.endswith('.md'),
+        'o': lambda f: '--original' in f,
+    }
+    matches = matchers.get(del_type)
     
-    for f in os.listdir(LOCAL_OUTPUT_FOLDER):
-        if del_type == 'a' and (f'--{VERSION}' in f or f'--analysis-{VERSION}' in f):
-            files_to_delete.append(f)
-        elif del_type == 'p' and '--s-' in f and '--sk-' not in f:
-            files_to_delete.append(f)
-        elif del_type == 'k' and '--sk-' in f:
-            files_to_delete.append(f)
-        elif del_type == 'm' and f.endswith('.md'):
-            files_to_delete.append(f)
-        elif del_type == 'o' and '--original' in f:
-            files_to_delete.append(f)
+    files_to_delete = []
+    if matches is not None:
+        with os.scandir(LOCAL_OUTPUT_FOLDER) as entries:
+            files_to_delete = [entry.name for entry in entries if matches(entry.name)]
     
     if not files_to_delete:
         print("No matching files found.")
@@ -1502,16 +1805,130 @@ def delete_local_files(del_type):
     
     confirm = input("\nDelete these files? (y/n): ").strip().lower()
     if confirm == 'y':
-        for f in files_to_delete:
+        def remove(f):
             try:
                 os.remove(os.path.join(LOCAL_OUTPUT_FOLDER, f))
+                return True
             except Exception as e:
                 print(f"Error deleting {f}: {e}")
-        print(f"Deleted {len(files_to_delete)} files.")
+                return False
+        
+        # unlink is a blocking syscall - threads overlap its latency
+        with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as pool:
+            deleted = sum(pool.map(remove, files_to_delete))
+        print(f"Deleted {deleted} files.")
     else:
         print("Cancelled.")
 
 
+def _process_downloaded_item(data, filename, output_dir):
+    """Process one downloaded image; returns (result, new CREATED_FILES entries)."""
+    first_new = len(CREATED_FILES)
+    result = process_single_image_from_bytes(data, filename, output_dir)
+    return result, CREATED_FILES[first_new:]
+
+
+def _process_gcs_images_locally(images, output_dir):
+    """
+    Download GCS images and process them into output_dir as a pipeline.
+    
+    A thread pool keeps up to DOWNLOAD_PREFETCH images downloading ahead of
+    processing, so network waits overlap with OpenCV work. Images are kept in
+    memory and decoded from bytes - nothing is staged in LOCAL_TEMP. Processing
+    runs in this process when NUM_WORKERS is 1, otherwise in a
+    ProcessPoolExecutor with at most 2 * NUM_WORKERS images in flight.
+    CREATED_FILES merging stays on the main thread.
+    
+    This is a generator: each result is yielded as soon as its image is
+    done, so callers can tally a batch without holding every result.
+    """
+    import time
+    total = len(images)
+    done = 0
+    processed = 0
+    total_start = time.time()
+    
+    def finish(result, created):
+        nonlocal done, processed
+        done += 1
+        CREATED_FILES.extend(created)
+        if result:
+            processed += 1
+        return result
+    
+    def download(gcs_path):
+        return download_bytes_from_gcs(GCS_BUCKET, gcs_path)
+    
+    paths = iter(images)
+    pending = deque()       # (gcs_path, download future), in listing order
+    in_flight = deque()     # processing futures when using workers
+    processor = None
+    configure_threads(NUM_WORKERS)
+    if NUM_WORKERS > 1:
+        processor = ProcessPoolExecutor(max_workers=NUM_WORKERS, initializer=_worker_init,
+                                        initargs=(_worker_settings(),))
+    
+    try:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as downloader:
+            for gcs_path in islice(paths, DOWNLOAD_PREFETCH):
+                pending.append((gcs_path, downloader.submit(download, gcs_path)))
+            
+            index = 0
+            while pending:
+                gcs_path, future = pending.popleft()
+                data = future.result()
+                next_path = next(paths, None)
+                if next_path is not None:
+                    pending.append((next_path, downloader.submit(download, next_path)))
+                index += 1
+                flush_log()
+                if data is None:
+                    continue
+                filename = os.path.basename(gcs_path)
+                
+                # Calculate ETA from completed images
+                if done > 0:
+                    elapsed = time.time() - total_start
+                    remaining = (total - index + 1) * elapsed / done
+                    eta_str = f" | ETA: {remaining/60:.1f} min" if remaining > 60 else f" | ETA: {remaining:.0f}s"
+                else:
+                    eta_str = ""
+                
+                print(f"\n{'='*60}")
+                print(f"[{index}/{total}] {filename}{eta_str}")
+                print(f"{'='*60}")
+                
+                if processor is None:
+                    # In-process: track_file() already appended to CREATED_FILES
+                    result, _ = _process_downloaded_item(data, filename, output_dir)
+                    result = finish(result, ())
+                    del data
+                    if result:
+                        yield result
+                else:
+                    in_flight.append(processor.submit(_process_downloaded_item, data, filename, output_dir))
+                    del data
+                    if len(in_flight) >= 2 * NUM_WORKERS:
+                        result = finish(*in_flight.popleft().result())
+                        if result:
+                            yield result
+            
+            while in_flight:
+                result = finish(*in_flight.popleft().result())
+                if result:
+                    yield result
+    finally:
+        if processor is not None:
+            processor.shutdown()
+        flush_log()
+    
+    # Print summary
+    total_time = time.time() - total_start
+    print(f"\n{'='*60}")
+    print(f"BATCH COMPLETE: {processed}/{total} images in {total_time/60:.1f} minutes")
+    print(f"{'='*60}")
+
+
 def process_gcs_all_images(limit=None):
     """Process ALL images from GCS without group filtering."""
     print("\n" + "=" * 60)
@@ -1528,58 +1945,17 @@ def process_gcs_all_images(limit=None):
     
     if not images:
         print("No images found!")
-        return []
+        return _summary()
     
     # Create output folder
     os.makedirs(LOCAL_OUTPUT_FOLDER, exist_ok=True)
     
-    import time
-    all_results = []
-    total_start = time.time()
-    
-    for i, gcs_path in enumerate(images):
-        filename = os.path.basename(gcs_path)
-        
-        # Calculate ETA
-        if i > 0:
-            elapsed = time.time() - total_start
-            avg_per_image = elapsed / i
-            remaining = (len(images) - i) * avg_per_image
-            eta_str = f" | ETA: {remaining/60:.1f} min" if remaining > 60 else f" | ETA: {remaining:.0f}s"
-        else:
-            eta_str = ""
-        
-        print(f"\n{'='*60}")
-        print(f"[{i+1}/{len(images)}] {filename}{eta_str}")
-        print(f"{'='*60}")
-        
-        # Download from GCS to temp
-        local_temp_path = os.path.join(LOCAL_TEMP, filename)
-        if not download_from_gcs(GCS_BUCKET, gcs_path, local_temp_path):
-            continue
-        
-        # Process and save to LOCAL_OUTPUT_FOLDER
-        result = process_single_image_local_only(local_temp_path, LOCAL_OUTPUT_FOLDER)
-        if result:
-            all_results.append(result)
-        
-        # Clean up temp file
-        try:
-            os.remove(local_temp_path)
-        except:
-            pass
-    
-    # Print summary
-    total_time = time.time() - total_start
-    print(f"\n{'='*60}")
-    print(f"BATCH COMPLETE: {len(all_results)}/{len(images)} images in {total_time/60:.1f} minutes")
-    print(f"{'='*60}")
-    
-    if all_results:
-        print_summary(all_results)
+    # Results are tallied as they stream in rather than kept for the batch
+    summary = print_summary(_process_gcs_images_locally(images, LOCAL_OUTPUT_FOLDER))
+    if summary['total_images']:
         save_session_manifest()
     
-    return all_results
+    return summary
 
 
 def process_gcs_to_local():
@@ -1595,103 +1971,69 @@ def process_gcs_to_local():
     selected_prefixes = get_selected_groups()
     if not selected_prefixes:
         print("No groups selected!")
-        return []
+        return _summary()
     
-    # List images from GCS
+    # List images from GCS (materialized - the ETA below needs the total)
     print("\nConnecting to GCS...")
-    images = list_gcs_images(GCS_BUCKET, GCS_SOURCE_FOLDER, 
-                             prefix_filter=set(selected_prefixes), 
-                             limit=TEST_LIMIT)
+    images = list(list_gcs_images(GCS_BUCKET, GCS_SOURCE_FOLDER, 
+                                  prefix_filter=set(selected_prefixes), 
+                                  limit=TEST_LIMIT))
     print(f"Found {len(images)} images in selected groups")
     
     if not images:
         print("No images found!")
-        return []
+        return _summary()
     
     # Create output folder
     os.makedirs(LOCAL_OUTPUT_FOLDER, exist_ok=True)
     
-    import time
-    all_results = []
-    total_start = time.time()
-    
-    for i, gcs_path in enumerate(images):
-        filename = os.path.basename(gcs_path)
-        
-        # Calculate ETA
-        if i > 0:
-            elapsed = time.time() - total_start
-            avg_per_image = elapsed / i
-            remaining = (len(images) - i) * avg_per_image
-            eta_str = f" | ETA: {remaining/60:.1f} min" if remaining > 60 else f" | ETA: {remaining:.0f}s"
-        else:
-            eta_str = ""
-        
-        print(f"\n{'='*60}")
-        print(f"[{i+1}/{len(images)}] {filename}{eta_str}")
-        print(f"{'='*60}")
-        
-        # Download from GCS to temp
-        local_temp_path = os.path.join(LOCAL_TEMP, filename)
-        if not download_from_gcs(GCS_BUCKET, gcs_path, local_temp_path):
-            continue
-        
-        # Process and save to LOCAL_OUTPUT_FOLDER
-        result = process_single_image_local_only(local_temp_path, LOCAL_OUTPUT_FOLDER)
-        if result:
-            all_results.append(result)
-        
-        # Clean up temp file
-        try:
-            os.remove(local_temp_path)
-        except:
-            pass
-    
-    # Print summary
-    total_time = time.time() - total_start
-    print(f"\n{'='*60}")
-    print(f"BATCH COMPLETE: {len(all_results)}/{len(images)} images in {total_time/60:.1f} minutes")
-    print(f"{'='*60}")
-    
-    if all_results:
-        print_summary(all_results)
+    # Results are tallied as they stream in rather than kept for the batch
+    summary = print_summary(_process_gcs_images_locally(images, LOCAL_OUTPUT_FOLDER))
+    if summary['total_images']:
         save_session_manifest()
     
-    return all_results
+    return summary
+
+
+def process_single_image_from_bytes(data, filename, output_dir):
+    """Process an encoded image held in memory (e.g. a GCS download) into output_dir."""
+    return process_single_image_local_only(filename, output_dir, image_bytes=data)
 
 
-def process_single_image_local_only(image_path, output_dir):
-    """Process image and save ONLY to local folder (no GCS upload)."""
+def process_single_image_local_only(image_path, output_dir, image_bytes=None):
+    """
+    Process image and save ONLY to local folder (no GCS upload).
+    
+    If image_bytes is given it is decoded in memory and image_path only
+    supplies the filename.
+    """
     import time
     start_time = time.time()
     
     filename = os.path.basename(image_path)
     base_name = os.path.splitext(filename)[0]
+    out_prefix = os.path.join(output_dir, "")
     
-    print(f"  Loading image...", end=" ", flush=True)
-    image = cv2.imread(image_path)
+    if image_bytes is not None:
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        image = cv2.imread(image_path)
     if image is None:
-        print(f"FAILED")
+        logger.error(f"  Loading image... FAILED")
+        flush_log()
         return None
-    print(f"OK ({image.shape[1]}x{image.shape[0]})")
+    logger.info(f"  Loaded image ({image.shape[1]}x{image.shape[0]})")
     
-    # Step 1: Color check
-    print(f"  [1/5] Color analysis...", end=" ", flush=True)
+    # Steps 1+2: Color check and grid detection (shared HSV/gray pass)
     t0 = time.time()
-    color_info = detect_color_composition(image)
-    print(f"{color_info['color_verdict']} ({time.time()-t0:.1f}s)")
-    
-    # Step 2: Grid detection
-    print(f"  [2/5] Grid detection...", end=" ", flush=True)
-    t0 = time.time()
-    grid_info = detect_grid_spacing(image)
-    print(f"{grid_info['confidence']} ({time.time()-t0:.1f}s)")
+    color_info, grid_info = analyze_image(image)
+    logger.info(f"  [1-2/5] Color + grid analysis: {color_info['color_verdict']} | "
+                f"grid {grid_info['confidence']} ({time.time()-t0:.1f}s)")
     
     # Step 3: Calibration
-    print(f"  [3/5] Calibration...", end=" ", flush=True)
     t0 = time.time()
     calibration_info = validate_calibration(grid_info, image.shape)
-    print(f"OK ({time.time()-t0:.1f}s)")
+    logger.info(f"  [3/5] Calibration: OK ({time.time()-t0:.1f}s)")
     
     results = {
         'filename': filename,
@@ -1703,120 +2045,127 @@ def process_single_image_local_only(image_path, output_dir):
         'red_scores': {},
         'local_files': []
     }
+    tracked = []        # (path, type) for every output, registered once at the end
     
     # Save original
     if SAVE_ORIGINALS:
-        print(f"  [4/5] Saving original...", end=" ", flush=True)
         t0 = time.time()
-        original_filename = generate_original_filename(filename)
-        original_path = os.path.join(output_dir, original_filename)
-        cv2.imwrite(original_path, image)
+        original_filename = generate_original_filename(base_name)
+        original_path = out_prefix + original_filename
+        save_original(original_path, image, source_path=image_path, source_bytes=image_bytes)
         results['local_files'].append(original_path)
-        track_file(original_path, "original")
-        print(f"OK ({time.time()-t0:.1f}s)")
+        tracked.append((original_path, "original"))
+        logger.info(f"  [4/5] Saved original ({time.time()-t0:.1f}s)")
     
     # Process if not monotone
     if not color_info['is_monotone']:
-        print(f"  [5/5] Color separation ({len(METHODS)} methods)...")
+        logger.info(f"  [5/5] Color separation ({len(METHODS)} methods)...")
         
-        for i, method in enumerate(METHODS):
-            print(f"        [{i+1}/{len(METHODS)}] {method}...", end=" ", flush=True)
-            t0 = time.time()
-            
-            if method == 'opencv':
-                ecg_img, ecg_pixels = isolate_ecg_opencv(image)
-                grid_img, grid_pixels = isolate_grid_opencv(image)
-            elif method == 'pillow':
-                ecg_img, ecg_pixels = isolate_ecg_pillow(image)
-                grid_img, grid_pixels = isolate_grid_pillow(image)
-            else:
-                print("SKIPPED")
-                continue
-            
-            black_score = calculate_black_quality_score(ecg_img)
-            red_score = calculate_red_quality_score(grid_img)
-            
-            results['black_scores'][method] = black_score
-            results['red_scores'][method] = red_score
-            results['methods'][method] = {
-                'black_score': black_score,
-                'red_score': red_score,
-                'ecg_img': ecg_img,
-                'grid_img': grid_img
-            }
+        # Methods are independent and OpenCV/NumPy release the GIL, so they run
+        # concurrently; saving and tracking stay in METHODS order on this thread.
+        hsv, text_mask = method_inputs(image)
+        best_black = best_red = None    # running keepers: (method, score, image)
+        with ThreadPoolExecutor(max_workers=METHOD_WORKERS) as pool:
+            # Only METHOD_WORKERS methods are queued ahead of the one being saved,
+            # and each outcome is dropped once saved, so outputs never pile up
+            queued = iter(METHODS)
+            futures = deque(pool.submit(_run_method, method, image, hsv, text_mask)
+                            for method in islice(queued, METHOD_WORKERS))
             
-            print(f"B:{black_score:,} R:{red_score} ({time.time()-t0:.1f}s)")
-            
-            # Save black
-            if ecg_pixels >= MIN_ECG_PIXELS:
-                print(f"              Saving black...", end=" ", flush=True)
-                black_filename = generate_output_filename(filename, method, 'black', black_score)
-                black_path = os.path.join(output_dir, black_filename)
-                cv2.imwrite(black_path, ecg_img)
-                results['local_files'].append(black_path)
-                track_file(black_path, "processed")
-                print("OK")
-            
-            # Save red
-            if grid_pixels >= MIN_GRID_PIXELS:
-                print(f"              Saving red...", end=" ", flush=True)
-                red_filename = generate_output_filename(filename, method, 'red', red_score)
-                red_path = os.path.join(output_dir, red_filename)
-                cv2.imwrite(red_path, grid_img)
-                results['local_files'].append(red_path)
-                track_file(red_path, "processed")
-                print("OK")
+            for i, method in enumerate(METHODS):
+                step = f"        [{i+1}/{len(METHODS)}] {method}"
+                outcome = futures.popleft().result()
+                next_method = next(queued, None)
+                if next_method is not None:
+                    futures.append(pool.submit(_run_method, next_method, image, hsv, text_mask))
+                if outcome is None:
+                    logger.info(f"{step}: SKIPPED")
+                    continue
+                ecg_img, ecg_pixels, grid_img, grid_pixels, black_score, red_score, elapsed = outcome
+                
+                results['black_scores'][method] = black_score
+                results['red_scores'][method] = red_score
+                results['methods'][method] = {
+                    'black_score': black_score,
+                    'red_score': red_score
+                }
+                
+                saved = []
+                
+                # Save black
+                if ecg_pixels >= MIN_ECG_PIXELS:
+                    black_filename = generate_output_filename(base_name, method, 'black', black_score)
+                    black_path = out_prefix + black_filename
+                    cv2.imwrite(black_path, ecg_img, PNG_PARAMS)
+                    results['local_files'].append(black_path)
+                    results['methods'][method]['black_path'] = black_path
+                    tracked.append((black_path, "processed"))
+                    saved.append("black")
+                
+                # Save red
+                if grid_pixels >= MIN_GRID_PIXELS:
+                    red_filename = generate_output_filename(base_name, method, 'red', red_score)
+                    red_path = out_prefix + red_filename
+                    cv2.imwrite(red_path, grid_img, PNG_PARAMS)
+                    results['local_files'].append(red_path)
+                    results['methods'][method]['red_path'] = red_path
+                    tracked.append((red_path, "processed"))
+                    saved.append("red")
+                
+                logger.info(f"{step}: B:{black_score:,} R:{red_score} ({elapsed:.1f}s) | "
+                            f"saved: {', '.join(saved) or 'none'}")
+                
+                # Hold on to this method's outputs only while they are the best so far
+                best_black = keep_best(best_black, method, black_score, ecg_img, higher_is_better=True)
+                best_red = keep_best(best_red, method, red_score, grid_img, higher_is_better=False)
+                del outcome, ecg_img, grid_img
+        
+        # Source image and shared method inputs are no longer needed - keepers
+        # reuse the best per-method outputs
+        del image, hsv, text_mask
         
         # Save keepers
-        if results['black_scores']:
-            print(f"        Saving KEEPER (best black)...", end=" ", flush=True)
-            best_black = max(results['black_scores'], key=results['black_scores'].get)
-            keeper_black_filename = generate_output_filename(filename, best_black, 'black', 
+        if best_black is not None:
+            best_black, _, best_black_img = best_black
+            keeper_black_filename = generate_output_filename(base_name, best_black, 'black', 
                                                              results['black_scores'][best_black], is_keeper=True)
-            keeper_path = os.path.join(output_dir, keeper_black_filename)
-            cv2.imwrite(keeper_path, results['methods'][best_black]['ecg_img'])
+            keeper_path = out_prefix + keeper_black_filename
+            save_keeper(keeper_path, best_black_img, results['methods'][best_black].get('black_path'))
             results['local_files'].append(keeper_path)
             results['keeper_black'] = {'method': best_black, 'score': results['black_scores'][best_black]}
-            track_file(keeper_path, "keeper")
-            print(f"{best_black} (score: {results['black_scores'][best_black]:,})")
+            tracked.append((keeper_path, "keeper"))
+            logger.info(f"        KEEPER (best black): {best_black} (score: {results['black_scores'][best_black]:,})")
         
-        if results['red_scores']:
-            print(f"        Saving KEEPER (best red)...", end=" ", flush=True)
-            best_red = min(results['red_scores'], key=results['red_scores'].get)
-            keeper_red_filename = generate_output_filename(filename, best_red, 'red',
+        if best_red is not None:
+            best_red, _, best_red_img = best_red
+            keeper_red_filename = generate_output_filename(base_name, best_red, 'red',
                                                            results['red_scores'][best_red], is_keeper=True)
-            keeper_path = os.path.join(output_dir, keeper_red_filename)
-            cv2.imwrite(keeper_path, results['methods'][best_red]['grid_img'])
+            keeper_path = out_prefix + keeper_red_filename
+            save_keeper(keeper_path, best_red_img, results['methods'][best_red].get('red_path'))
             results['local_files'].append(keeper_path)
             results['keeper_red'] = {'method': best_red, 'score': results['red_scores'][best_red]}
-            track_file(keeper_path, "keeper")
-            print(f"{best_red} (score: {results['red_scores'][best_red]})")
+            tracked.append((keeper_path, "keeper"))
+            logger.info(f"        KEEPER (best red): {best_red} (score: {results['red_scores'][best_red]})")
     else:
-        print(f"  [5/5] Color separation SKIPPED - Image is monotone")
+        logger.info(f"  [5/5] Color separation SKIPPED - Image is monotone")
     
     # Generate analysis MD
     if GENERATE_ANALYSIS_MD:
-        print(f"  Generating analysis report...", end=" ", flush=True)
         t0 = time.time()
-        md_content = generate_analysis_md(filename, color_info, grid_info, calibration_info, results)
-        analysis_filename = generate_analysis_filename(filename)
-        analysis_path = os.path.join(output_dir, analysis_filename)
-        with open(analysis_path, 'w', encoding='utf-8') as f:
-            f.write(md_content)
+        analysis_filename = generate_analysis_filename(base_name)
+        analysis_path = out_prefix + analysis_filename
+        with open(analysis_path, 'w', encoding='utf-8', buffering=MD_WRITE_BUFFER) as f:
+            write_analysis_md(f, filename, color_info, grid_info, calibration_info, results)
         results['local_files'].append(analysis_path)
-        track_file(analysis_path, "analysis")
-        print(f"OK ({time.time()-t0:.1f}s)")
+        tracked.append((analysis_path, "analysis"))
+        logger.info(f"  Analysis report written ({time.time()-t0:.1f}s)")
     
-    # Clean up image data
-    for method in results['methods']:
-        if 'ecg_img' in results['methods'][method]:
-            del results['methods'][method]['ecg_img']
-        if 'grid_img' in results['methods'][method]:
-            del results['methods'][method]['grid_img']
+    track_files(tracked)
     
     total_time = time.time() - start_time
     files_created = len(results['local_files'])
-    print(f"  DONE: {files_created} files created in {total_time:.1f}s")
+    logger.info(f"  DONE: {files_created} files created in {total_time:.1f}s")
+    flush_log()
     
     return results
 
@@ -2102,25 +2451,25 @@ def scan_bucket_contents():
     print(f"\nScanning bucket: {GCS_BUCKET}")
     print("This may take a moment...")
     
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(GCS_BUCKET)
+    if bucket is None:
         print("Could not connect to GCS!")
         return
     
     try:
-        bucket = client.bucket(GCS_BUCKET)
-        blobs = list(bucket.list_blobs(max_results=500))
-        
-        print(f"\nFound {len(blobs)} items in bucket (showing first 500)")
+        # Names only, tallied as pages arrive rather than materialized first
+        blobs = bucket.list_blobs(max_results=500, fields=GCS_NAME_FIELDS)
         
         # Analyze what's there
+        item_count = 0
         folders = set()
-        file_types = {}
+        file_types = Counter()
         image_files = []
         prefixes = set()
         
         for blob in blobs:
             name = blob.name
+            item_count += 1
             
             # Track folders
             if '/' in name:
@@ -2129,10 +2478,10 @@ def scan_bucket_contents():
             
             # Track file types
             ext = os.path.splitext(name)[1].lower()
-            file_types[ext] = file_types.get(ext, 0) + 1
+            file_types[ext] += 1
             
             # Track image files and their prefixes
-            if ext in ['.png', '.jpg', '.jpeg']:
+            if ext in IMAGE_EXTENSIONS:
                 image_files.append(name)
                 # Extract prefix (number before first dash)
                 basename = os.path.basename(name)
@@ -2141,9 +2490,10 @@ def scan_bucket_contents():
                     if prefix.isdigit():
                         prefixes.add(prefix)
         
+        print(f"\nFound {item_count} items in bucket (showing first 500)")
         print(f"\nFolders found: {sorted(folders) if folders else 'None (files at root)'}")
         print(f"\nFile types:")
-        for ext, count in sorted(file_types.items(), key=lambda x: -x[1]):
+        for ext, count in file_types.most_common():
             print(f"  {ext or '(no extension)'}: {count}")
         
         print(f"\nImage files found: {len(image_files)}")
@@ -2172,24 +2522,22 @@ def scan_bucket_contents():
 
 def list_all_gcs_images_no_filter(bucket_name, limit=None):
     """List ALL images in GCS bucket without prefix filtering."""
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return []
     
     try:
-        bucket = client.bucket(bucket_name)
-        blobs = bucket.list_blobs()
+        blobs = bucket.list_blobs(page_size=GCS_LIST_PAGE_SIZE, fields=GCS_NAME_FIELDS)
         
         images = []
         for blob in blobs:
             name = blob.name.lower()
-            # Get any image file
-            if name.endswith('.png') or name.endswith('.jpg') or name.endswith('.jpeg'):
-                # Skip already processed
-                if '--s-' not in name and '--sk-' not in name and '--original' not in name:
-                    images.append(blob.name)
-                    if limit and len(images) >= limit:
-                        break
+            # Get any image file, skipping already processed outputs
+            if (name.endswith(IMAGE_EXTENSIONS)
+                    and '--s-' not in name and '--sk-' not in name and '--original' not in name):
+                images.append(blob.name)
+                if limit and len(images) >= limit:
+                    break
         
         return images
     except Exception as e:
@@ -4,27 +4,138 @@ Processes multiple ECG images and ranks them by quality
 """
 
 import os
+import sys
 import json
-from typing import List, Dict, Optional
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
 from pathlib import Path
-from tqdm import tqdm
+import numpy as np
 import pandas as pd
 
 from digitization_pipeline import ECGDigitizer
 from quality_assessment import QualityAssessor
 
+# tqdm is optional - progress bars are only drawn on an interactive terminal
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+# orjson is optional - serializes the numpy lead arrays natively when installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# pyarrow is optional - multithreaded C CSV writer for the quality report
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# One BatchProcessor per pool worker, built once by _init_worker
+_worker_processor = None
+
+# Columns of the quality report CSV, in output order
+REPORT_COLUMNS = ('image_name', 'image_path', 'overall_score', 'mean_snr', 'min_snr',
+                  'grid_score', 'clarity_score', 'completeness_score', 'num_leads',
+                  'valid_leads')
+
+# Image files picked up by process_batch_from_dir
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+
+
+def _overall_score(result: Dict) -> float:
+    """Overall quality score of a result: the flattened key set by
+    _process_single_image, else the nested quality dict (older results), else 0"""
+    if 'overall_score' in result:
+        return result['overall_score']
+    return result.get('quality', {}).get('overall_score', 0.0)
+
+
+def _json_default(obj):
+    """JSON fallback: numpy arrays/scalars as numbers, anything else as str"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def _write_json(path: str, obj):
+    """Write results as indented JSON"""
+    if ORJSON_AVAILABLE:
+        # Contiguous arrays are serialized in C; the rest go through the default
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, default=_json_default,
+                                 option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2, default=_json_default)
+
+
+def _thin_result(result: Dict) -> Dict:
+    """Copy of a result with the lead sample values dropped (they go to signals.npz)"""
+    if 'leads' not in result:
+        return result
+    leads = [{key: value for key, value in lead.items() if key != 'values'}
+             for lead in result['leads']]
+    return {**result, 'leads': leads}
+
+
+def _quantize_leads(leads: List[Dict]) -> Tuple[Dict[str, np.ndarray], float]:
+    """
+    Quantize an image's lead values to int16 with one shared scale
+    
+    Returns:
+        ({lead_name: int16 samples}, scale) - original values are samples * scale
+    """
+    arrays = {lead['name']: np.asarray(lead.get('values', ()), dtype=np.float64) for lead in leads}
+    # Non-finite samples (failed traces) are stored as 0 rather than cast to garbage
+    arrays = {name: np.where(np.isfinite(a), a, 0.0) for name, a in arrays.items()}
+    peak = max((float(np.nanmax(np.abs(a))) for a in arrays.values() if a.size), default=0.0)
+    scale = peak / 32767.0 if np.isfinite(peak) and peak > 0 else 1.0
+    quantized = {name: np.round(a / scale).astype(np.int16) for name, a in arrays.items()}
+    return quantized, scale
+
+
+def _no_progress(iterable, **kwargs):
+    """Progress wrapper for headless runs: the iterable unchanged"""
+    return iterable
+
+
+def _init_worker(use_segmented: bool, enable_visualization: bool):
+    """Pool initializer: build the worker's digitizer and quality assessor once"""
+    global _worker_processor
+    _worker_processor = BatchProcessor(use_segmented, enable_visualization, max_workers=1)
+
+
+def _process_in_worker(item: Tuple[str, Optional[str]]) -> Dict:
+    """Pool task: process one (image_path, image_name) with the worker's BatchProcessor"""
+    image_path, image_name = item
+    return _worker_processor._safe_process_single_image(image_path, image_name)
+
 
 class BatchProcessor:
     """Process multiple ECG images in batch"""
     
-    def __init__(self, use_segmented: bool = True, enable_visualization: bool = False):
+    def __init__(self, use_segmented: bool = True, enable_visualization: bool = False,
+                 max_workers: Optional[int] = 1):
         """
         Initialize batch processor
         
         Args:
             use_segmented: Use segmented processing
             enable_visualization: Enable line visualization
+            max_workers: Worker processes for process_batch (1 = serial, None = CPU count)
         """
+        self.use_segmented = use_segmented
+        self.enable_visualization = enable_visualization
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.digitizer = ECGDigitizer(
             use_segmented_processing=use_segmented,
             enable_visualization=enable_visualization
@@ -35,30 +146,66 @@ class BatchProcessor:
         self.results = []
     
     def process_batch(self, image_paths: List[str], 
-                     output_dir: Optional[str] = None) -> List[Dict]:
+                     output_dir: Optional[str] = None,
+                     progress: Optional[Callable] = None) -> List[Dict]:
         """
         Process a batch of images
         
         Args:
             image_paths: List of paths to ECG images
             output_dir: Optional directory to save results
+            progress: tqdm-style wrapper for the result stream (default: tqdm
+                when installed and stderr is a terminal, no progress output otherwise)
             
         Returns:
             List of processing results
         """
-        results = []
-        
-        for image_path in tqdm(image_paths, desc="Processing images"):
-            try:
-                result = self._process_single_image(image_path)
-                results.append(result)
-            except Exception as e:
-                print(f"Error processing {image_path}: {e}")
-                results.append({
-                    'image_path': image_path,
-                    'error': str(e),
-                    'success': False
-                })
+        return self._process_items([(image_path, None) for image_path in image_paths],
+                                   output_dir, progress)
+    
+    def process_batch_from_dir(self, directory: str,
+                               output_dir: Optional[str] = None,
+                               progress: Optional[Callable] = None) -> List[Dict]:
+        """
+        Process every image in a directory
+        
+        Names come straight from the directory listing, so no per-image
+        stat or basename is needed.
+        
+        Args:
+            directory: Directory containing ECG images
+            output_dir: Optional directory to save results
+            progress: tqdm-style progress wrapper (see process_batch)
+            
+        Returns:
+            List of processing results (sorted by file name)
+        """
+        with os.scandir(directory) as it:
+            items = sorted((entry.path, entry.name) for entry in it
+                           if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file())
+        return self._process_items(items, output_dir, progress)
+    
+    def _process_items(self, items: List[Tuple[str, Optional[str]]],
+                       output_dir: Optional[str] = None,
+                       progress: Optional[Callable] = None) -> List[Dict]:
+        """Process (image_path, image_name) items; a None name is taken from the path"""
+        if progress is None:
+            progress = tqdm if TQDM_AVAILABLE and sys.stderr.isatty() else _no_progress
+        workers = min(self.max_workers, len(items))
+        
+        if workers <= 1:
+            results = [self._safe_process_single_image(image_path, image_name)
+                       for image_path, image_name in progress(items, desc="Processing images")]
+        else:
+            # Digitization is CPU-bound, so spread it over processes; each
+            # worker builds its ECGDigitizer once in the initializer
+            chunksize = max(1, len(items) // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.use_segmented, self.enable_visualization)) as executor:
+                # Redraw at most once a second rather than on every completion
+                results = list(progress(executor.map(_process_in_worker, items, chunksize=chunksize),
+                                        total=len(items), desc="Processing images",
+                                        mininterval=1.0, smoothing=0))
         
         self.results = results
         
@@ -68,7 +215,21 @@ class BatchProcessor:
         
         return results
     
-    def _process_single_image(self, image_path: str) -> Dict:
+    def _safe_process_single_image(self, image_path: str,
+                                   image_name: Optional[str] = None) -> Dict:
+        """Process a single image, returning an error result instead of raising"""
+        try:
+            return self._process_single_image(image_path, image_name)
+        except Exception as e:
+            print(f"Error processing {image_path}: {e}")
+            return {
+                'image_path': image_path,
+                'error': str(e),
+                'success': False
+            }
+    
+    def _process_single_image(self, image_path: str,
+                              image_name: Optional[str] = None) -> Dict:
         """Process a single image"""
         # Process image
         result = self.digitizer.process_image(image_path)
@@ -81,11 +242,12 @@ class BatchProcessor:
         
         return {
             'image_path': image_path,
-            'image_name': os.path.basename(image_path),
+            'image_name': image_name or os.path.basename(image_path),
             'success': True,
             'leads': result['leads'],
             'metadata': result['metadata'],
-            'quality': quality
+            'quality': quality,
+            'overall_score': quality.get('overall_score', 0.0)
         }
     
     def rank_by_quality(self, results: Optional[List[Dict]] = None) -> List[Dict]:
@@ -105,11 +267,7 @@ class BatchProcessor:
         successful = [r for r in results if r.get('success', False)]
         
         # Sort by overall quality score
-        ranked = sorted(
-            successful,
-            key=lambda x: x.get('quality', {}).get('overall_score', 0.0),
-            reverse=True
-        )
+        ranked = sorted(successful, key=_overall_score, reverse=True)
         
         return ranked
     
@@ -125,8 +283,13 @@ class BatchProcessor:
         Returns:
             List of top N results
         """
-        ranked = self.rank_by_quality(results)
-        return ranked[:n]
+        if results is None:
+            results = self.results
+        
+        # Partial selection instead of ranking the whole batch; same order as
+        # rank_by_quality(results)[:n], ties included
+        successful = (r for r in results if r.get('success', False))
+        return heapq.nlargest(n, successful, key=_overall_score)
     
     def generate_quality_report(self, output_path: str, 
                                results: Optional[List[Dict]] = None):
@@ -140,8 +303,9 @@ class BatchProcessor:
         if results is None:
             results = self.results
         
-        # Extract metrics for each image
-        report_data = []
+        # Extract metrics for each image, one list per column so the
+        # DataFrame is built column-wise instead of parsing a dict per row
+        cols = {name: [] for name in REPORT_COLUMNS}
         for result in results:
             if not result.get('success', False):
                 continue
@@ -152,23 +316,24 @@ class BatchProcessor:
             signal_clarity = quality.get('signal_clarity', {})
             completeness = quality.get('completeness', {})
             
-            report_data.append({
-                'image_name': result.get('image_name', ''),
-                'image_path': result.get('image_path', ''),
-                'overall_score': quality.get('overall_score', 0.0),
-                'mean_snr': snr.get('mean_snr', 0.0),
-                'min_snr': snr.get('min_snr', 0.0),
-                'grid_score': grid_quality.get('grid_score', 0.0) if grid_quality else 0.0,
-                'clarity_score': signal_clarity.get('clarity_score', 0.0),
-                'completeness_score': completeness.get('overall_completeness', 0.0),
-                'num_leads': completeness.get('num_leads', 0),
-                'valid_leads': completeness.get('valid_leads', 0)
-            })
+            cols['image_name'].append(result.get('image_name', ''))
+            cols['image_path'].append(result.get('image_path', ''))
+            cols['overall_score'].append(_overall_score(result))
+            cols['mean_snr'].append(snr.get('mean_snr', 0.0))
+            cols['min_snr'].append(snr.get('min_snr', 0.0))
+            cols['grid_score'].append(grid_quality.get('grid_score', 0.0) if grid_quality else 0.0)
+            cols['clarity_score'].append(signal_clarity.get('clarity_score', 0.0))
+            cols['completeness_score'].append(completeness.get('overall_completeness', 0.0))
+            cols['num_leads'].append(completeness.get('num_leads', 0))
+            cols['valid_leads'].append(completeness.get('valid_leads', 0))
         
         # Create DataFrame and save
-        df = pd.DataFrame(report_data)
+        df = pd.DataFrame(cols)
         df = df.sort_values('overall_score', ascending=False)
-        df.to_csv(output_path, index=False)
+        if PYARROW_AVAILABLE:
+            pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), output_path)
+        else:
+            df.to_csv(output_path, index=False)
         
         return df
     
@@ -176,10 +341,22 @@ class BatchProcessor:
         """Save processing results to output directory"""
         os.makedirs(output_dir, exist_ok=True)
         
-        # Save full results as JSON
+        # Save lead signals in one compressed archive: int16 samples keyed
+        # "<i>/<lead>" plus the image's "<i>/scale", so values = samples * scale,
+        # where i is the result's index in batch_results.json (image names
+        # can repeat across directories). The JSON results keep everything else
+        signals_path = os.path.join(output_dir, 'signals.npz')
+        signals = {}
+        for i, result in enumerate(self.results):
+            if result.get('success', False):
+                quantized, scale = _quantize_leads(result['leads'])
+                for lead_name, samples in quantized.items():
+                    signals[f"{i}/{lead_name}"] = samples
+                signals[f"{i}/scale"] = np.float64(scale)
+        np.savez_compressed(signals_path, **signals)
+        
         results_path = os.path.join(output_dir, 'batch_results.json')
-        with open(results_path, 'w') as f:
-            json.dump(self.results, f, indent=2, default=str)
+        _write_json(results_path, [_thin_result(result) for result in self.results])
         
         # Generate quality report
         report_path = os.path.join(output_dir, 'quality_report.csv')
@@ -188,10 +365,10 @@ class BatchProcessor:
         # Save best images list
         best_images = self.get_best_images(10)
         best_path = os.path.join(output_dir, 'best_images.json')
-        with open(best_path, 'w') as f:
-            json.dump(best_images, f, indent=2, default=str)
+        _write_json(best_path, [_thin_result(result) for result in best_images])
         
         print(f"Results saved to {output_dir}")
         print(f"  - Full results: {results_path}")
+        print(f"  - Lead signals: {signals_path}")
         print(f"  - Quality report: {report_path}")
         print(f"  - Best images: {best_path}")
@@ -4,14 +4,29 @@ Test specific functions or processes with multiple images in parallel
 
 Documentation:
 - Purpose: Test individual functions or pipeline steps with bulk image sets
-- Architecture: Async testing with result tracking and comparison
+- Architecture: Async API over a thread pool, with result tracking and comparison
 - What works: Parallel execution, result aggregation, error tracking
 - What didn't work: Synchronous testing (too slow), single-threaded approach
-- Changes: Added async support, result caching, comparison metrics
+- Changes: Added async support, result caching, comparison metrics;
+  blocking work moved to a thread pool (the async-only version ran serially)
+- Threading: OpenCV's own thread pool is disabled at import (ECG_CV2_THREADS,
+  default 0) so it doesn't oversubscribe the cores the outer pool is using
+- JPEG decode: the opencv-python wheels ship libjpeg-turbo; for a custom build,
+  check cv2.getBuildInformation() for "JPEG: libjpeg-turbo"
 """
 
 import asyncio
+import hashlib
+import io
 import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import numpy as np
 import cv2
 from typing import Dict, List, Callable, Any, Optional
@@ -27,6 +42,20 @@ try:
 except ImportError:
     GCS_AVAILABLE = False
 
+# gcloud-aio-storage is optional - async GCS downloads over one shared session
+try:
+    from gcloud.aio.storage import Storage as AioStorage
+    AIO_STORAGE_AVAILABLE = True
+except ImportError:
+    AIO_STORAGE_AVAILABLE = False
+
+# orjson is optional - fast streaming writes in save_results when installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Import transformers for testing
 try:
     from transformers.edge_detector import EdgeDetector, detect_edges, crop_to_content
@@ -37,6 +66,24 @@ try:
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
 
+# cv2 read flags per decode_scale (reduced modes decode at 1/2, 1/4, 1/8 size)
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# OpenCV threads per call (0 = single-threaded). The thread pool already runs
+# max_workers decodes at once; set ECG_CV2_THREADS to hand threading back to cv2
+cv2.setNumThreads(int(os.environ.get('ECG_CV2_THREADS', '0')))
+
+# Exact types kept as TestResult metrics; numpy scalars are converted to
+# Python values so results serialize without numpy special-casing
+_SCALAR_TYPES = frozenset({int, float, str, bool, np.bool_, np.float32, np.float64,
+                           np.int32, np.int64})
+_PY_SCALARS = (int, float, str, bool)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -44,6 +91,10 @@ logger = logging.getLogger(__name__)
 class TestResult:
     """Result from a single test execution."""
     
+    # Fixed attribute set: no per-instance __dict__ across large bulk runs
+    __slots__ = ('test_name', 'image_path', 'success', 'result', 'error', 'metrics',
+                 'execution_time', 'timestamp')
+    
     def __init__(self, test_name: str, image_path: str, success: bool, 
                  result: Any = None, error: str = None, metrics: Dict = None,
                  execution_time: float = 0.0):
@@ -70,15 +121,62 @@ class TestResult:
         }
 
 
+class _BufferWriter(io.RawIOBase):
+    """Write-only file object that fills a preallocated buffer in place."""
+    
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._pos
+    
+    def write(self, data) -> int:
+        end = self._pos + len(data)
+        if end > len(self._view):
+            raise ValueError("Download is larger than the blob size")
+        self._view[self._pos:end] = data
+        self._pos = end
+        return len(data)
+
+
 class BulkTester:
     """
     Bulk testing framework for ECG processing functions.
     
     Notebook-ready: Yes - can be used in Kaggle notebook
+    
+    GCS downloads use GCS_CHUNK_SIZE (16 MB) chunks rather than the library's
+    ~1 MB default; larger reads are several times faster per image at a cost
+    of up to GCS_CHUNK_SIZE * max_workers of buffer memory.
     """
     
-    def __init__(self, max_workers: int = 10):
+    # GCS download chunk size (bytes)
+    GCS_CHUNK_SIZE = 16 << 20
+    
+    # Per-request timeout for gcloud-aio-storage downloads (seconds)
+    GCS_TIMEOUT = 30
+    
+    # Local files at least this large are decoded from an mmap (bytes); below
+    # it the mapping setup costs more than cv2.imread's heap read
+    MMAP_THRESHOLD = 8 << 20
+    
+    def __init__(self, max_workers: int = 10, cache_dir: Optional[str] = None,
+                 reuse_buffers: bool = True):
+        """
+        Args:
+            max_workers: Images tested concurrently
+            cache_dir: On-disk cache for GCS images (default ~/.cache/ecg_bulk)
+            reuse_buffers: Download GCS images into a per-thread buffer kept
+                across images (holds the largest image seen per pool thread)
+        """
         self.max_workers = max_workers
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / '.cache' / 'ecg_bulk'
+        self.reuse_buffers = reuse_buffers
+        self._local = threading.local()
         self.results: List[TestResult] = []
         self.gcs_client = None
         
@@ -94,6 +192,7 @@ class BulkTester:
                           test_name: str,
                           source: str = 'local',  # 'local', 'gcs'
                           bucket_name: str = None,
+                          decode_scale: int = 1,
                           **kwargs) -> List[TestResult]:
         """
         Test a function with multiple images.
@@ -104,6 +203,8 @@ class BulkTester:
             test_name: Name for this test
             source: 'local' or 'gcs'
             bucket_name: GCS bucket name if source is 'gcs'
+            decode_scale: Decode images at 1/1, 1/2, 1/4 or 1/8 size (the
+                decoder skips the detail, so this is cheaper than resizing)
             **kwargs: Additional arguments to pass to function
             
         Returns:
@@ -111,168 +212,280 @@ class BulkTester:
         """
         logger.info(f"Testing {test_name} with {len(image_paths)} images")
         
-        # Create tasks for parallel execution
-        tasks = []
-        for image_path in image_paths:
-            if source == 'gcs':
-                task = self._test_gcs_image(function, image_path, test_name, 
-                                          bucket_name, **kwargs)
-            else:
-                task = self._test_local_image(function, image_path, test_name, **kwargs)
-            tasks.append(task)
+        flags = DECODE_FLAGS[decode_scale]
+        if source == 'gcs':
+            load = partial(self._load_gcs_image, bucket_name=bucket_name, flags=flags)
+        else:
+            load = partial(self._load_local_image, flags=flags)
         
-        # Execute in parallel (limit concurrency)
-        semaphore = asyncio.Semaphore(self.max_workers)
+        # kwargs are the same for every image, so bind them once
+        bound = partial(function, **kwargs) if kwargs else function
         
-        async def bounded_task(task):
-            async with semaphore:
-                return await task
+        # Image loading and the tested functions block (cv2, GCS downloads), so
+        # they run on a thread pool; max_workers worker coroutines feed it
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            if source == 'gcs' and AIO_STORAGE_AVAILABLE:
+                # Downloads run on the event loop over one shared aiohttp session
+                # instead of a blocking HTTP/1.1 request per pool thread
+                async with AioStorage() as client:
+                    fetch = partial(self._load_gcs_image_aio, client, pool,
+                                    bucket_name=bucket_name, flags=flags)
+                    results = await self._run_workers(
+                        partial(self._test_async, pool, fetch, bound, test_name), image_paths)
+            elif asyncio.iscoroutinefunction(function):
+                # Coroutine functions run on the event loop; only the load is pooled
+                fetch = partial(loop.run_in_executor, pool, load)
+                results = await self._run_workers(
+                    partial(self._test_async, pool, fetch, bound, test_name), image_paths)
+            else:
+                results = await self._run_workers(
+                    partial(loop.run_in_executor, pool, self._run_test, load, bound, test_name),
+                    image_paths)
         
-        results = await asyncio.gather(*[bounded_task(task) for task in tasks])
         self.results.extend(results)
         
         return results
     
-    async def _test_local_image(self, function: Callable, image_path: str, 
-                               test_name: str, **kwargs) -> TestResult:
-        """Test function with local image."""
-        start_time = datetime.now()
+    async def _run_workers(self, run: Callable, image_paths: List[str]) -> List[TestResult]:
+        """Await run(image_path) for every path with max_workers worker coroutines.
+        
+        A fixed set of workers draining a queue keeps at most max_workers images
+        in flight, rather than one pending task per image. Results keep the
+        order of image_paths.
+        """
+        queue = asyncio.Queue()
+        for item in enumerate(image_paths):
+            queue.put_nowait(item)
+        results = [None] * len(image_paths)
+        
+        async def worker():
+            while True:
+                try:
+                    i, image_path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[i] = await run(image_path)
+        
+        await asyncio.gather(*[worker() for _ in range(min(self.max_workers, len(image_paths)))])
+        return results
+    
+    def _load_local_image(self, image_path: str, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+        """Load a local image."""
+        if os.path.getsize(image_path) >= self.MMAP_THRESHOLD:
+            image = self._decode_mmap(image_path, flags)
+        else:
+            image = cv2.imread(image_path, flags)
+        if image is None:
+            raise ValueError(f"Failed to load image: {image_path}")
+        return image
+    
+    @staticmethod
+    def _decode_mmap(image_path: str, flags: int) -> Optional[np.ndarray]:
+        """Decode a file straight from the page cache, without a heap copy of it."""
+        with open(image_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = np.frombuffer(mm, np.uint8)
+            image = cv2.imdecode(buf, flags)
+            # The mmap can't close while an array still exports its buffer
+            del buf
+        return image
+    
+    def _load_gcs_image(self, image_path: str, bucket_name: str,
+                        flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+        """Download and decode a GCS image."""
+        if not GCS_AVAILABLE or self.gcs_client is None:
+            raise ImportError("GCS not available")
+        
+        bucket = self.gcs_client.bucket(bucket_name)
+        blob = bucket.blob(image_path, chunk_size=self.GCS_CHUNK_SIZE)
+        blob.reload()
+        cache_path = self._gcs_cache_path(bucket_name, image_path, blob.generation)
+        if cache_path.exists():
+            image = cv2.imread(str(cache_path), flags)
+            if image is not None:
+                return image
+        
+        if self.reuse_buffers and blob.size:
+            # Fill this thread's buffer in place instead of growing a fresh one
+            with memoryview(self._download_buffer(blob.size))[:blob.size] as view:
+                writer = _BufferWriter(view)
+                blob.download_to_file(writer, if_generation_match=blob.generation)
+                return self._decode_and_cache(view[:writer.tell()], cache_path,
+                                              image_path, flags)
+        
+        # Stream the download into a buffer and decode from a view of it,
+        # without materializing a separate bytes copy
+        with io.BytesIO() as buffer:
+            blob.download_to_file(buffer, if_generation_match=blob.generation)
+            with buffer.getbuffer() as view:
+                return self._decode_and_cache(view, cache_path, image_path, flags)
+    
+    def _download_buffer(self, size: int) -> bytearray:
+        """This thread's download buffer, reallocated only when size outgrows it."""
+        buf = getattr(self._local, 'buf', None)
+        if buf is None or len(buf) < size:
+            buf = self._local.buf = bytearray(size)
+        return buf
+    
+    async def _load_gcs_image_aio(self, client: Any, pool: ThreadPoolExecutor,
+                                  image_path: str, bucket_name: str,
+                                  flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+        """Download a GCS image with gcloud-aio-storage and decode it on the pool."""
+        loop = asyncio.get_running_loop()
+        metadata = await client.download_metadata(bucket_name, image_path)
+        cache_path = self._gcs_cache_path(bucket_name, image_path, metadata['generation'])
+        if cache_path.exists():
+            image = await loop.run_in_executor(pool, cv2.imread, str(cache_path), flags)
+            if image is not None:
+                return image
+        
+        data = await client.download(bucket_name, image_path, timeout=self.GCS_TIMEOUT)
+        return await loop.run_in_executor(pool, self._decode_and_cache,
+                                          data, cache_path, image_path, flags)
+    
+    def _gcs_cache_path(self, bucket_name: str, image_path: str, generation: Any) -> Path:
+        """Cache file for one object generation.
+        
+        A re-uploaded blob gets a new generation and so a new cache entry,
+        while repeat tests read from local disk.
+        """
+        cache_key = hashlib.blake2b(
+            f"{bucket_name}/{image_path}@{generation}".encode()).hexdigest()
+        return self.cache_dir / cache_key
+    
+    def _decode_and_cache(self, data: Any, cache_path: Path, image_path: str,
+                          flags: int) -> np.ndarray:
+        """Decode downloaded image bytes and, if they decode, cache them on disk."""
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+        if image is None:
+            raise ValueError(f"Failed to decode image: {image_path}")
+        
+        # Write to a temp file and rename so readers never see a partial file
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+        return image
+    
+    def _run_test(self, load: Callable, function: Callable, test_name: str,
+                  image_path: str) -> TestResult:
+        """Load an image and run a synchronous function on it (pool thread)."""
+        start_ns = time.perf_counter_ns()
         try:
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Failed to load image: {image_path}")
-            
-            # Run function
-            if asyncio.iscoroutinefunction(function):
-                result = await function(image, **kwargs)
-            else:
-                result = function(image, **kwargs)
-            
-            execution_time = (datetime.now() - start_time).total_seconds()
-            
-            # Extract metrics if result is a dict
-            metrics = {}
-            if isinstance(result, dict):
-                metrics = {k: v for k, v in result.items() 
-                          if isinstance(v, (int, float, str, bool))}
-            
-            return TestResult(
-                test_name=test_name,
-                image_path=image_path,
-                success=True,
-                result=result,
-                metrics=metrics,
-                execution_time=execution_time
-            )
-            
+            image = load(image_path)
+            result = function(image)
+            return self._success_result(test_name, image_path, result, start_ns)
         except Exception as e:
-            execution_time = (datetime.now() - start_time).total_seconds()
-            return TestResult(
-                test_name=test_name,
-                image_path=image_path,
-                success=False,
-                error=str(e),
-                execution_time=execution_time
-            )
-    
-    async def _test_gcs_image(self, function: Callable, image_path: str,
-                            test_name: str, bucket_name: str, **kwargs) -> TestResult:
-        """Test function with GCS image."""
-        start_time = datetime.now()
+            return self._error_result(test_name, image_path, e, start_ns)
+    
+    async def _test_async(self, pool: ThreadPoolExecutor, fetch: Callable, function: Callable,
+                          test_name: str, image_path: str) -> TestResult:
+        """Await an image from fetch, then run function on it.
+        
+        Coroutine functions are awaited on the event loop; others run on the pool.
+        """
+        start_ns = time.perf_counter_ns()
         try:
-            if not GCS_AVAILABLE or self.gcs_client is None:
-                raise ImportError("GCS not available")
-            
-            # Download image
-            bucket = self.gcs_client.bucket(bucket_name)
-            blob = bucket.blob(image_path)
-            image_data = blob.download_as_bytes()
-            
-            # Decode image
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if image is None:
-                raise ValueError(f"Failed to decode image: {image_path}")
-            
-            # Run function
+            image = await fetch(image_path)
             if asyncio.iscoroutinefunction(function):
-                result = await function(image, **kwargs)
+                result = await function(image)
             else:
-                result = function(image, **kwargs)
-            
-            execution_time = (datetime.now() - start_time).total_seconds()
-            
-            # Extract metrics
-            metrics = {}
-            if isinstance(result, dict):
-                metrics = {k: v for k, v in result.items() 
-                          if isinstance(v, (int, float, str, bool))}
-            
-            return TestResult(
-                test_name=test_name,
-                image_path=image_path,
-                success=True,
-                result=result,
-                metrics=metrics,
-                execution_time=execution_time
-            )
-            
+                result = await asyncio.get_running_loop().run_in_executor(pool, function, image)
+            return self._success_result(test_name, image_path, result, start_ns)
         except Exception as e:
-            execution_time = (datetime.now() - start_time).total_seconds()
-            return TestResult(
-                test_name=test_name,
-                image_path=image_path,
-                success=False,
-                error=str(e),
-                execution_time=execution_time
-            )
+            return self._error_result(test_name, image_path, e, start_ns)
+    
+    @staticmethod
+    def _success_result(test_name: str, image_path: str, result: Any,
+                        start_ns: int) -> TestResult:
+        """Build a successful TestResult, extracting metrics if result is a dict."""
+        execution_time = (time.perf_counter_ns() - start_ns) * 1e-9
+        
+        metrics = {}
+        if isinstance(result, dict):
+            # Exact-type set lookup first; isinstance only for subclasses it misses
+            metrics = {k: (v.item() if isinstance(v, np.generic) else v)
+                       for k, v in result.items()
+                       if type(v) in _SCALAR_TYPES or isinstance(v, _PY_SCALARS)}
+        
+        return TestResult(
+            test_name=test_name,
+            image_path=image_path,
+            success=True,
+            result=result,
+            metrics=metrics,
+            execution_time=execution_time
+        )
+    
+    @staticmethod
+    def _error_result(test_name: str, image_path: str, error: Exception,
+                      start_ns: int) -> TestResult:
+        """Build a failed TestResult."""
+        execution_time = (time.perf_counter_ns() - start_ns) * 1e-9
+        return TestResult(
+            test_name=test_name,
+            image_path=image_path,
+            success=False,
+            error=str(error),
+            execution_time=execution_time
+        )
     
     def get_summary(self) -> Dict:
         """Get summary statistics."""
         if not self.results:
             return {'message': 'No results yet'}
         
-        total = len(self.results)
-        successful = sum(1 for r in self.results if r.success)
-        failed = total - successful
-        
-        # Group by test name
-        by_test = {}
+        # Single pass: per test [total, success, time_sum]
+        totals = defaultdict(lambda: [0, 0, 0.0])
+        successful = 0
+        total_time = 0.0
         for result in self.results:
-            if result.test_name not in by_test:
-                by_test[result.test_name] = {'total': 0, 'success': 0, 'failed': 0, 
-                                            'avg_time': 0.0}
-            by_test[result.test_name]['total'] += 1
-            if result.success:
-                by_test[result.test_name]['success'] += 1
-            else:
-                by_test[result.test_name]['failed'] += 1
-            by_test[result.test_name]['avg_time'] += result.execution_time
+            t = totals[result.test_name]
+            t[0] += 1
+            t[1] += result.success
+            t[2] += result.execution_time
+            successful += result.success
+            total_time += result.execution_time
         
-        # Calculate averages
-        for test_name in by_test:
-            count = by_test[test_name]['total']
-            by_test[test_name]['avg_time'] /= count if count > 0 else 1
+        total = len(self.results)
+        by_test = {
+            test_name: {'total': count, 'success': ok, 'failed': count - ok,
+                        'avg_time': time_sum / count}
+            for test_name, (count, ok, time_sum) in totals.items()
+        }
         
         return {
             'total_tests': total,
             'successful': successful,
-            'failed': failed,
-            'success_rate': successful / total if total > 0 else 0,
+            'failed': total - successful,
+            'success_rate': successful / total,
             'by_test': by_test,
-            'total_execution_time': sum(r.execution_time for r in self.results)
+            'total_execution_time': total_time
         }
     
     def save_results(self, output_path: str):
         """Save results to JSON file."""
-        data = {
-            'summary': self.get_summary(),
-            'results': [r.to_dict() for r in self.results]
-        }
+        summary = self.get_summary()
         
-        with open(output_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        if ORJSON_AVAILABLE:
+            # Stream one result per line rather than building every dict first
+            with open(output_path, 'wb') as f:
+                f.write(b'{"summary": ')
+                f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+                f.write(b',\n"results": [\n')
+                for i, r in enumerate(self.results):
+                    if i:
+                        f.write(b',\n')
+                    f.write(orjson.dumps(r.to_dict(), option=orjson.OPT_SERIALIZE_NUMPY))
+                f.write(b'\n]}\n')
+        else:
+            data = {
+                'summary': summary,
+                'results': [r.to_dict() for r in self.results]
+            }
+            with open(output_path, 'w') as f:
+                json.dump(data, f, indent=2)
         
         logger.info(f"Results saved to {output_path}")
     
@@ -284,7 +497,7 @@ class BulkTester:
 # Convenience functions for common tests
 
 async def test_edge_detection(image_paths: List[str], source: str = 'local',
-                              bucket_name: str = None) -> List[TestResult]:
+                              bucket_name: str = None, decode_scale: int = 1) -> List[TestResult]:
     """Test edge detection on multiple images."""
     tester = BulkTester()
     await tester.test_function(
@@ -293,48 +506,49 @@ async def test_edge_detection(image_paths: List[str], source: str = 'local',
         test_name='edge_detection',
         source=source,
         bucket_name=bucket_name,
+        decode_scale=decode_scale,
         method='canny'
     )
     return tester.results
 
 
 async def test_color_separation(image_paths: List[str], method: str = 'lab',
-                               source: str = 'local', bucket_name: str = None) -> List[TestResult]:
+                               source: str = 'local', bucket_name: str = None,
+                               decode_scale: int = 1) -> List[TestResult]:
     """Test color separation on multiple images."""
     tester = BulkTester()
     
-    def separate_colors(image):
-        separator = ColorSeparator()
-        if method == 'hsv':
-            return separator.separate_hsv(image)
-        else:
-            return separator.separate_lab(image)
+    # One separator for the whole run; it only holds its method, so the pool
+    # threads can share it
+    separator = ColorSeparator(method=method)
     
     await tester.test_function(
-        function=separate_colors,
+        function=separator.separate,
         image_paths=image_paths,
         test_name=f'color_separation_{method}',
         source=source,
-        bucket_name=bucket_name
+        bucket_name=bucket_name,
+        decode_scale=decode_scale
     )
     return tester.results
 
 
 async def test_quality_gates(image_paths: List[str], source: str = 'local',
-                            bucket_name: str = None) -> List[TestResult]:
+                            bucket_name: str = None, decode_scale: int = 1) -> List[TestResult]:
     """Test quality gates on multiple images."""
     tester = BulkTester()
     
-    def check_quality(image):
-        gates = QualityGates()
-        return gates.check_all(image)
+    # One instance for the whole run; it only holds thresholds, so the pool
+    # threads can share it
+    gates = QualityGates()
     
     await tester.test_function(
-        function=check_quality,
+        function=gates.check_all,
         image_paths=image_paths,
         test_name='quality_gates',
         source=source,
-        bucket_name=bucket_name
+        bucket_name=bucket_name,
+        decode_scale=decode_scale
     )
     return tester.results
 
@@ -3,10 +3,15 @@ Data Loader Module
 Handle competition data structure with Kaggle API integration
 """
 
+import hashlib
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional, Iterator
+from typing import List, Dict, Optional, Iterator, Tuple
 import numpy as np
+import cv2
 from PIL import Image
 
 # Import Kaggle loader if available
@@ -19,6 +24,32 @@ except ImportError:
     KAGGLE_AVAILABLE = False
     KaggleDataLoader = None
 
+# Image file extensions (lowercase; matched case-insensitively on local disk)
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+
+# Threads decoding images ahead of the consumer in iterate_images
+PREFETCH_WORKERS = 4
+
+
+def _read_image(file_path, return_rgb: bool = False) -> np.ndarray:
+    """
+    Decode an image file with OpenCV (BGR, same as bulk_tester)
+    
+    Args:
+        file_path: Path to image file
+        return_rgb: Return RGB channel order instead of BGR
+        
+    Returns:
+        Image as HxWx3 uint8 numpy array
+    """
+    img = cv2.imread(str(file_path), cv2.IMREAD_COLOR)
+    if img is None:
+        # OpenCV can't decode some TIFF variants - fall back to PIL
+        with Image.open(file_path) as pil_img:
+            rgb = np.asarray(pil_img.convert('RGB'))
+        return rgb if return_rgb else cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if return_rgb else img
+
 
 class CompetitionDataLoader:
     """Load and organize competition data"""
@@ -26,7 +57,8 @@ class CompetitionDataLoader:
     def __init__(self, data_source: str = 'kaggle',
                 competition_name: str = 'physionet-ecg-image-digitization',
                 local_dir: Optional[str] = None,
-                cache_dir: Optional[str] = None):
+                cache_dir: Optional[str] = None,
+                list_ttl: float = 300.0):
         """
         Initialize data loader
         
@@ -35,11 +67,14 @@ class CompetitionDataLoader:
             competition_name: Competition name for Kaggle
             local_dir: Local directory path (for 'local' source)
             cache_dir: Cache directory for Kaggle downloads
+            list_ttl: Seconds to reuse the Kaggle file listing before refetching
         """
         self.data_source = data_source
         self.competition_name = competition_name
         self.local_dir = Path(local_dir) if local_dir else None
         self.cache_dir = Path(cache_dir) if cache_dir else Path('data/cache')
+        self.list_ttl = list_ttl
+        self._listing = None  # (monotonic timestamp, list_files() result)
         
         if data_source == 'kaggle':
             if not KAGGLE_AVAILABLE:
@@ -55,21 +90,22 @@ class CompetitionDataLoader:
             if not self.local_dir or not self.local_dir.exists():
                 raise ValueError(f"Local directory does not exist: {local_dir}")
     
-    def list_images(self, subset: str = 'train') -> List[str]:
+    def list_images(self, subset: str = 'train', recursive: bool = False) -> List[str]:
         """
         List available images
         
         Args:
             subset: 'train', 'test', or 'all'
+            recursive: Also search subdirectories (local source only)
             
         Returns:
             List of image filenames
         """
         if self.data_source == 'kaggle':
-            all_files = self.kaggle_loader.list_files()
+            all_files = self._list_kaggle_files()
             image_files = [
                 f['name'] for f in all_files
-                if f['name'].endswith(('.jpg', '.jpeg', '.png', '.tif', '.tiff'))
+                if f['name'].endswith(IMAGE_EXTS)
             ]
             
             # Filter by subset if specified
@@ -78,38 +114,56 @@ class CompetitionDataLoader:
             
             return image_files
         else:
-            # Local directory
-            image_extensions = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
-            image_files = []
-            
+            # Local directory - one listing pass, extension checked per entry
             search_dir = self.local_dir / subset if (self.local_dir / subset).exists() else self.local_dir
             
-            for ext in image_extensions:
-                image_files.extend(search_dir.glob(f'*{ext}'))
-                image_files.extend(search_dir.glob(f'*{ext.upper()}'))
+            if recursive:
+                image_files = [
+                    os.path.join(root, name)
+                    for root, _, names in os.walk(search_dir)
+                    for name in names if name.lower().endswith(IMAGE_EXTS)
+                ]
+            else:
+                with os.scandir(search_dir) as it:
+                    image_files = [
+                        entry.path for entry in it
+                        if entry.is_file(follow_symlinks=False)
+                        and entry.name.lower().endswith(IMAGE_EXTS)
+                    ]
             
-            return [str(f.relative_to(self.local_dir)) for f in image_files]
+            return [os.path.relpath(f, self.local_dir) for f in image_files]
+    
+    def _list_kaggle_files(self) -> List[Dict]:
+        """Kaggle file listing, reused for list_ttl seconds to skip API round-trips"""
+        now = time.monotonic()
+        if self._listing is None or now - self._listing[0] >= self.list_ttl:
+            self._listing = (now, self.kaggle_loader.list_files())
+        return self._listing[1]
+    
+    def invalidate_listing(self):
+        """Drop the cached Kaggle listing so the next list_images() refetches it"""
+        self._listing = None
     
-    def load_image(self, filename: str) -> np.ndarray:
+    def load_image(self, filename: str, return_rgb: bool = False) -> np.ndarray:
         """
         Load an image as numpy array
         
         Args:
             filename: Image filename
+            return_rgb: Return RGB channel order instead of BGR
             
         Returns:
-            Image as numpy array
+            Image as numpy array (BGR by default, matching bulk_tester)
         """
         if self.data_source == 'kaggle':
-            return self.kaggle_loader.load_image(filename)
+            file_path = self.kaggle_loader.download_file(filename, use_cache=True)
         else:
             # Local file
             file_path = self.local_dir / filename
             if not file_path.exists():
                 raise FileNotFoundError(f"Image not found: {file_path}")
-            
-            img = Image.open(file_path)
-            return np.array(img)
+        
+        return _read_image(file_path, return_rgb)
     
     def get_image_path(self, filename: str) -> str:
         """
@@ -143,57 +197,91 @@ class CompetitionDataLoader:
         # For now, return None
         return None
     
-    def get_train_test_split(self, train_ratio: float = 0.8) -> Tuple[List[str], List[str]]:
+    def get_train_test_split(self, train_ratio: float = 0.8,
+                             method: str = 'hash') -> Tuple[List[str], List[str]]:
         """
         Get train/test split of images
         
+        The 'hash' split puts each file in train or test from a hash of its
+        name, so a file stays on the same side when others are added or removed.
+        'shuffle' is the old seeded shuffle, which reorders everything whenever
+        the file set changes.
+        
         Args:
             train_ratio: Ratio of training images
+            method: 'hash' or 'shuffle'
             
         Returns:
             (train_images, test_images) tuple
         """
         all_images = self.list_images('all')
         
-        # Shuffle
-        np.random.seed(42)
-        np.random.shuffle(all_images)
+        if method == 'shuffle':
+            np.random.seed(42)
+            np.random.shuffle(all_images)
+            
+            split_idx = int(len(all_images) * train_ratio)
+            return all_images[:split_idx], all_images[split_idx:]
         
-        split_idx = int(len(all_images) * train_ratio)
-        train_images = all_images[:split_idx]
-        test_images = all_images[split_idx:]
+        train_images, test_images = [], []
+        threshold = int(train_ratio * (1 << 32))
+        for filename in all_images:
+            digest = hashlib.blake2b(filename.encode(), digest_size=4).digest()
+            if int.from_bytes(digest, 'big') < threshold:
+                train_images.append(filename)
+            else:
+                test_images.append(filename)
         
         return train_images, test_images
     
     def iterate_images(self, subset: str = 'train',
-                      batch_size: int = 1) -> Iterator[List[tuple]]:
+                      batch_size: int = 1, prefetch: int = 2) -> Iterator[List[tuple]]:
         """
         Iterate over images in batches
         
+        Loads run on a thread pool, so the next `prefetch` batches are decoded
+        while the caller works on the current one.
+        
         Args:
             subset: 'train', 'test', or 'all'
             batch_size: Number of images per batch
+            prefetch: Number of batches to load ahead of the consumer
             
         Yields:
             List of (filename, image_array) tuples
         """
         image_files = self.list_images(subset)
+        starts = iter(range(0, len(image_files), batch_size))
+        pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+        pending = deque()
         
-        for i in range(0, len(image_files), batch_size):
-            batch_files = image_files[i:i+batch_size]
-            batch = []
-            
-            for filename in batch_files:
-                try:
-                    image = self.load_image(filename)
-                    batch.append((filename, image))
-                except Exception as e:
-                    print(f"Error loading {filename}: {e}")
-                    continue
+        def submit_next():
+            start = next(starts, None)
+            if start is not None:
+                pending.append([(filename, pool.submit(self.load_image, filename))
+                                for filename in image_files[start:start + batch_size]])
+        
+        try:
+            for _ in range(prefetch + 1):
+                submit_next()
             
-            if batch:
-                yield batch
-
+            while pending:
+                futures = pending.popleft()
+                submit_next()
+                batch = []
+                
+                for filename, future in futures:
+                    try:
+                        batch.append((filename, future.result()))
+                    except Exception as e:
+                        print(f"Error loading {filename}: {e}")
+                        continue
+                
+                if batch:
+                    yield batch
+        finally:
+            # Drop queued loads if the caller stops iterating early
+            pool.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     import sys
@@ -10,22 +10,259 @@ This can be deployed as:
 
 import numpy as np
 import cv2
+from concurrent.futures import ThreadPoolExecutor
 from scipy import signal
 from scipy.ndimage import gaussian_filter1d, median_filter
 from typing import Dict, List, Tuple, Optional
+from fractions import Fraction
+import base64
 import json
 from grid_detection import GridDetector
 from segmented_processing import SegmentedProcessor
 from line_visualization import LineVisualizer
 
+# numba is optional - JIT kernel for trace extraction (ECGDigitizer(jit_trace=True))
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Keep OpenCV's SIMD code paths on (a build or another import may have turned
+# them off). Its thread count is left at the default (all cores) unless
+# ECGDigitizer is given opencv_threads
+cv2.setUseOptimized(True)
+
+# Output sampling rate (Hz)
+SAMPLING_RATE = 500
+
+# Filter designs for SAMPLING_RATE - fixed, so designed once at import
+HP_SOS = signal.butter(3, 0.5, btype='high', fs=SAMPLING_RATE, output='sos')  # baseline wander
+LP_SOS = signal.butter(3, 100, btype='low', fs=SAMPLING_RATE, output='sos')  # HF noise
+HP_LP_SOS = np.vstack((HP_SOS, LP_SOS))  # both as one cascade - a single sosfilt pass
+BP_SOS_40_100 = signal.butter(3, [40, 100], btype='band', fs=SAMPLING_RATE, output='sos')  # SNR noise band
+NOTCH50 = signal.iirnotch(50, 30, SAMPLING_RATE)  # powerline (b, a)
+NOTCH60 = signal.iirnotch(60, 30, SAMPLING_RATE)
+NOTCH_PADLEN = 3 * len(NOTCH50[1])  # filtfilt's default edge padding for the notches
+
+# Lead layout: 3 columns x 4 rows (+ rhythm strip), listed row by row
+LEAD_GRID = [
+    ['I', 'aVR', 'V1'],
+    ['II', 'aVL', 'V2'],
+    ['III', 'aVF', 'V3'],
+    ['V4', 'V5', 'V6'],
+]
+
+# Coarse tracing: full-resolution rows searched either side of the coarse center
+TRACE_REFINE_BAND = 8
+
+# Quantized transport: lead values as little-endian int16 steps of
+# QUANT_SCALE mV (1 uV, +/-32.767 mV range)
+QUANT_SCALE = 0.001
+QUANT_DTYPE = '<i2'
+
+# Largest up/down factor for polyphase resampling - the anti-aliasing filter
+# grows with it, so the exact ratio is approximated above this
+RESAMPLE_MAX_FACTOR = 1000
+
+
+def _trace_centers(regions: np.ndarray,
+                   light: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Intensity-weighted row centroid of each column's dark pixels
+    
+    Each column is inverted if its background is light and thresholded
+    adaptively (75th percentile, or mean + std for flat columns, kept within
+    30-80% of the column max). All columns are processed at once.
+    
+    Args:
+        regions: (..., height, width) region or stack of equal-size regions
+        light: (..., 1, width) light-background flags, if already known
+    
+    Returns:
+        (center, found), each (..., width) - center is only meaningful where
+        found is True
+    """
+    height = regions.shape[-2]
+    
+    # Find signal position (darkest pixels)
+    if light is None:
+        light = regions.mean(axis=-2, keepdims=True) > 128
+    if regions.dtype == np.uint8:
+        # 255 - x == x ^ 255 for uint8: invert light columns in one pass
+        # instead of materializing 255 - regions and selecting from it
+        column = regions ^ (light * np.uint8(255))
+    else:
+        column = np.where(light, 255 - regions, regions)
+    
+    # FEATURE 2.1: Adaptive threshold per column
+    col_max = column.max(axis=-2).astype(np.float64)
+    col_mean = column.mean(axis=-2)
+    col_std = column.std(axis=-2)
+    threshold = np.where(col_std > 10,
+                         np.percentile(column, 75, axis=-2),
+                         col_mean + col_std)
+    threshold = np.minimum(np.maximum(threshold, col_max * 0.3), col_max * 0.8)
+    
+    weights = np.where(column > threshold[..., None, :], column, 0).astype(np.float64)
+    weight_sum = weights.sum(axis=-2)
+    found = weight_sum > 0
+    center = np.arange(height, dtype=np.float64) @ weights / np.where(found, weight_sum, 1)
+    return center, found
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def _trace_centers_jit(regions):
+        """_trace_centers as a compiled kernel for a (n, height, width) stack:
+        columns in parallel, each one copied out once and scanned while it
+        sits in cache"""
+        n, height, width = regions.shape
+        center = np.zeros((n, width))
+        found = np.zeros((n, width), dtype=np.bool_)
+        for k in prange(n * width):
+            i = k // width
+            c = k - i * width
+            column = regions[i, :, c].astype(np.float64)
+            if column.mean() > 128:
+                column = 255.0 - column
+            col_max = column.max()
+            col_mean = column.mean()
+            col_std = column.std()
+            if col_std > 10:
+                threshold = np.percentile(column, 75)
+            else:
+                threshold = col_mean + col_std
+            threshold = min(max(threshold, col_max * 0.3), col_max * 0.8)
+            
+            weight_sum = 0.0
+            row_sum = 0.0
+            for r in range(height):
+                v = column[r]
+                if v > threshold:
+                    weight_sum += v
+                    row_sum += r * v
+            if weight_sum > 0:
+                center[i, c] = row_sum / weight_sum
+                found[i, c] = True
+        return center, found
+
+
+def _trace_centers_coarse(regions: np.ndarray,
+                          band: int = TRACE_REFINE_BAND) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    _trace_centers on a half-height copy, refined at full resolution
+    
+    The trace is a 1-D curve, so the adaptive thresholding runs over half the
+    rows, and only a 2*band-row window around each coarse center is read
+    again at full resolution. Approximate: a window can miss trace pixels that
+    the full column would have included.
+    """
+    height = regions.shape[-2]
+    half = height // 2
+    if half < 2 * band:
+        return _trace_centers(regions)
+    
+    # 2x vertical area downsample (rounded mean of row pairs)
+    pairs = regions[..., :2 * half, :].astype(np.uint16)
+    small = ((pairs[..., 0::2, :] + pairs[..., 1::2, :] + 1) >> 1).astype(np.uint8)
+    light = small.mean(axis=-2, keepdims=True) > 128
+    coarse, found = _trace_centers(small, light)
+    
+    # Re-center in the full-resolution window; polarity comes from the whole
+    # column, since a window around the trace is mostly trace
+    start = np.clip(np.rint(2 * coarse + 0.5).astype(np.intp) - band, 0, height - 2 * band)
+    rows = start[..., None, :] + np.arange(2 * band)[:, None]
+    window = np.take_along_axis(regions, rows, axis=-2)
+    center, found_fine = _trace_centers(window, light)
+    return center + start, found & found_fine
+
+
+def _resample(x: np.ndarray, num: int) -> np.ndarray:
+    """
+    Resample x to num samples with a polyphase filter
+    
+    Real-valued FIR work instead of signal.resample's full complex FFT. The
+    ends are extended along a fitted line (padtype='line') rather than
+    zero-padded, so the filter doesn't pull them toward 0 mV. The output is
+    trimmed or edge-padded to exactly num samples when the ratio had to be
+    approximated.
+    """
+    up, down = Fraction(num, len(x)).limit_denominator(RESAMPLE_MAX_FACTOR).as_integer_ratio()
+    resampled = signal.resample_poly(x, up, down, padtype='line')
+    if len(resampled) >= num:
+        return resampled[:num]
+    return np.pad(resampled, (0, num - len(resampled)), mode='edge')
+
+
+def _trace_voltages(regions: np.ndarray, pixels_per_mv: float,
+                    coarse: bool = False, jit: bool = False) -> np.ndarray:
+    """
+    Column-wise trace position of a lead region, as voltage (mV)
+    
+    Columns without dark pixels repeat the previous voltage (0 before the
+    first hit).
+    
+    Args:
+        regions: (height, width) region or (n, height, width) stack of regions
+        pixels_per_mv: Vertical scale
+        coarse: Use the faster, approximate _trace_centers_coarse
+        jit: Use the numba kernel _trace_centers_jit when numba is installed
+    
+    Returns:
+        (width,) or (n, width) voltages
+    """
+    height, width = regions.shape[-2:]
+    if coarse:
+        center, found = _trace_centers_coarse(regions)
+    elif jit and NUMBA_AVAILABLE:
+        stack = np.ascontiguousarray(regions).reshape(-1, height, width)
+        center, found = _trace_centers_jit(stack)
+        center = center.reshape(regions.shape[:-2] + (width,))
+        found = found.reshape(center.shape)
+    else:
+        center, found = _trace_centers(regions)
+    voltage = (height / 2 - center) / pixels_per_mv
+    
+    # FEATURE 2.1: Better fallback - carry the last found voltage forward
+    last = np.maximum.accumulate(np.where(found, np.arange(width), -1), axis=-1)
+    return np.where(last >= 0, np.take_along_axis(voltage, np.maximum(last, 0), axis=-1), 0.0)
+
 
 class ECGDigitizer:
     """Main class for ECG image digitization"""
     
     def __init__(self, use_segmented_processing: bool = True, 
-                 enable_visualization: bool = False):
+                 enable_visualization: bool = False, n_jobs: int = 1,
+                 coarse_trace: bool = False, high_quality_denoise: bool = False,
+                 opencv_threads: Optional[int] = None, use_segmented_grid: bool = False,
+                 jit_trace: bool = False):
+        """
+        Args:
+            use_segmented_processing: Extract signals in overlapping segments
+            enable_visualization: Save grid line visualizations
+            n_jobs: Threads for per-lead signal extraction (1 = sequential).
+                The work is NumPy/SciPy, which releases the GIL
+            coarse_trace: Locate the trace on a half-height copy and refine it
+                near the coarse position (faster, approximate)
+            high_quality_denoise: Use non-local means denoising on low-contrast
+                images (much slower) instead of the bilateral filter
+            opencv_threads: Threads for OpenCV's internally parallel calls
+                (denoising, CLAHE, Canny, warpAffine). None keeps OpenCV's
+                default of all cores. Process-wide setting - use 1 on
+                single-vCPU Cloud Run / Cloud Functions instances, or when
+                images are already processed in parallel, to avoid
+                oversubscription
+            use_segmented_grid: Also detect the grid per segment (requires
+                use_segmented_processing). Segment grids are not merged
+                yet, so calibration falls back to the default spacing
+            jit_trace: Locate the trace with the numba kernel (needs numba).
+                Same result and ~55 ms faster per image, but the first call
+                in a process without a warm numba cache compiles for ~25 s -
+                only worth it for long-running batch processes
+        """
         self.lead_names = ['I', 'II', 'III', 'aVR', 'aVL', 'aVF', 'V1', 'V2', 'V3', 'V4', 'V5', 'V6']
-        self.sampling_rate = 500  # Hz
+        self.sampling_rate = SAMPLING_RATE  # Hz
         self.grid_spacing_mm = 1.0  # mm per small square
         self.voltage_scale = 0.1  # mV per mm (standard ECG)
         self.time_scale = 0.04  # seconds per mm (25 mm/s standard)
@@ -35,6 +272,13 @@ class ECGDigitizer:
         self.segmented_processor = SegmentedProcessor(overlap_ratio=0.2) if use_segmented_processing else None
         self.visualizer = LineVisualizer() if enable_visualization else None
         self.use_segmented = use_segmented_processing
+        self.use_segmented_grid = use_segmented_grid
+        self.n_jobs = n_jobs
+        self.coarse_trace = coarse_trace
+        self.jit_trace = jit_trace
+        self.high_quality_denoise = high_quality_denoise
+        if opencv_threads is not None:
+            cv2.setNumThreads(max(1, opencv_threads))
         
     def process_image(self, image_path: str) -> Dict:
         """
@@ -62,13 +306,25 @@ class ECGDigitizer:
         calibration = self.calibrate_scales(grid_info)
         
         # Step 3: Detect and extract leads
-        lead_regions = self.detect_leads(preprocessed, grid_info)
+        lead_names, lead_stack = self.detect_lead_stack(preprocessed, grid_info)
         
-        # Step 4: Extract signals from each lead
-        signals = {}
-        for lead_name, region in lead_regions.items():
-            signal_data = self.extract_signal(region, calibration)
-            signals[lead_name] = signal_data
+        # Standard traces for every lead in one batched call (segmented
+        # extraction works per region, so it computes its own)
+        if self._extracts_segmented(lead_stack.shape[2]):
+            traces = [None] * len(lead_names)
+        else:
+            traces = _trace_voltages(lead_stack, calibration['pixels_per_mv'],
+                                     self.coarse_trace, self.jit_trace)
+        
+        # Step 4: Extract signals from each lead (leads are independent)
+        if self.n_jobs > 1:
+            with ThreadPoolExecutor(max_workers=min(self.n_jobs, len(lead_names))) as pool:
+                extracted = pool.map(self.extract_signal, lead_stack,
+                                     [calibration] * len(lead_names), traces)
+                signals = dict(zip(lead_names, extracted))
+        else:
+            signals = {lead_name: self.extract_signal(region, calibration, trace)
+                       for lead_name, region, trace in zip(lead_names, lead_stack, traces)}
             
         # Step 5: Post-process signals
         processed_signals = self.post_process_signals(signals)
@@ -86,47 +342,49 @@ class ECGDigitizer:
         }
     
     def load_image(self, image_path: str) -> np.ndarray:
-        """Load and convert image to grayscale"""
-        image = cv2.imread(image_path)
-        if image is None:
+        """Load image as grayscale"""
+        # Decode straight to one channel: no BGR image, no BGR2GRAY pass
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
             raise ValueError(f"Could not load image: {image_path}")
         
-        # Convert to grayscale
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-            
         return gray
     
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """
         OPTIMIZED: Preprocess image with faster denoising and rotation correction
-        Changes: Adaptive denoising based on image quality, faster rotation correction
+        Changes: Bilateral denoising (adaptive NLM with high_quality_denoise),
+        faster rotation correction
         """
-        # OPTIMIZATION: Adaptive denoising based on image quality
-        image_std = np.std(image)
+        # One working buffer for the whole chain: every stage after denoising
+        # writes in place instead of allocating a new full-size image
+        buf = np.empty_like(image)
+        
+        # OPTIMIZATION: Adaptive denoising based on image quality - NLM costs
+        # ~100x the edge-preserving bilateral filter, so it is opt-in
+        image_std = np.std(image) if self.high_quality_denoise else np.inf
         
         if image_std > 40:  # High quality image, use lighter denoising
             # Use faster bilateral filter instead of slow NLM
-            denoised = cv2.bilateralFilter(image, 5, 50, 50)
+            cv2.bilateralFilter(image, 5, 50, 50, dst=buf)
         elif image_std > 20:  # Medium quality, use reduced NLM parameters
             # Reduced parameters: (10, 7, 21) -> (5, 7, 15) = 2-3x faster
-            denoised = cv2.fastNlMeansDenoising(image, None, 5, 7, 15)
+            cv2.fastNlMeansDenoising(image, buf, 5, 7, 15)
         else:  # Low quality, use full denoising
-            denoised = cv2.fastNlMeansDenoising(image, None, 10, 7, 21)
+            cv2.fastNlMeansDenoising(image, buf, 10, 7, 21)
         
         # 2. Enhance contrast using CLAHE (keep this, it's fast)
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(denoised)
+        clahe.apply(buf, buf)
         
-        # 3. OPTIMIZED: Faster rotation correction
-        rotated = self.correct_rotation(enhanced)
+        # 3. OPTIMIZED: Faster rotation correction (returns buf itself, or a
+        # new image when it rotates - warpAffine can't work in place)
+        rotated = self.correct_rotation(buf)
         
         # 4. Binarize (threshold)
-        _, binary = cv2.threshold(rotated, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        cv2.threshold(rotated, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=rotated)
         
-        return binary
+        return rotated
     
     def correct_rotation(self, image: np.ndarray) -> np.ndarray:
         """
@@ -146,20 +404,14 @@ class ECGDigitizer:
             return image
         
         # OPTIMIZATION: Only process top 20 lines (instead of all)
-        lines_to_process = min(20, len(lines))
-        angles = []
+        angles = np.degrees(lines[:20, 0, 1]) - 90
+        angles = angles[np.abs(angles) < 45]  # Only consider small rotations
         
-        for line in lines[:lines_to_process]:
-            rho, theta = line[0]
-            angle = np.degrees(theta) - 90
-            if abs(angle) < 45:  # Only consider small rotations
-                angles.append(angle)
-        
-        if not angles:
+        if angles.size == 0:
             return image
         
         # Use median angle to avoid outliers
-        rotation_angle = np.median(angles)
+        rotation_angle = float(np.median(angles))
         
         # OPTIMIZATION: Only rotate if angle is significant (> 0.5 degrees)
         if abs(rotation_angle) < 0.5:
@@ -185,7 +437,7 @@ class ECGDigitizer:
         Returns:
             Dictionary containing grid information
         """
-        if self.use_segmented and self.segmented_processor:
+        if self.use_segmented_grid and self.segmented_processor:
             # Use segmented processing for grid detection
             def process_segment(seg_image, params):
                 return self.grid_detector.detect_grid(seg_image)
@@ -233,53 +485,19 @@ class ECGDigitizer:
             # Safely extract coordinates from intersections
             # Handle both dict and list formats
             try:
-                y_coords = []
-                x_coords = []
-                
-                for item in intersections:
-                    if isinstance(item, dict):
-                        # Dictionary format: {'x': ..., 'y': ...}
-                        # Handle nested dicts or direct values
-                        x_val = item.get('x')
-                        y_val = item.get('y')
-                        
-                        # If values are dicts, try to extract numeric values
-                        if isinstance(x_val, dict):
-                            # Try common keys
-                            x_val = x_val.get('value') or x_val.get('coord') or x_val.get('x')
-                        if isinstance(y_val, dict):
-                            y_val = y_val.get('value') or y_val.get('coord') or y_val.get('y')
-                        
-                        # Convert to float if possible
-                        try:
-                            if x_val is not None and y_val is not None:
-                                x_coords.append(float(x_val))
-                                y_coords.append(float(y_val))
-                        except (ValueError, TypeError):
-                            continue  # Skip this intersection if conversion fails
-                    elif isinstance(item, (list, tuple)) and len(item) >= 2:
-                        # List/tuple format: [x, y] or (x, y)
-                        try:
-                            x_coords.append(float(item[0]))
-                            y_coords.append(float(item[1]))
-                        except (ValueError, TypeError):
-                            continue  # Skip this intersection if conversion fails
+                points = self._intersection_points(intersections)
                 
                 # Group intersections by approximate grid position
-                # For horizontal spacing, look at y-coordinates
-                if len(y_coords) > 1:
-                    y_coords = sorted(y_coords)
-                    v_spacings = np.diff(y_coords)
+                if len(points) > 1:
+                    # For horizontal spacing, look at y-coordinates
+                    v_spacings = np.diff(np.sort(points[:, 1]))
                     v_spacing = float(np.median(v_spacings[v_spacings > 0]))
-                else:
-                    v_spacing = grid_info.get('vertical_spacing', 10.0)
-                
-                # For vertical spacing, look at x-coordinates
-                if len(x_coords) > 1:
-                    x_coords = sorted(x_coords)
-                    h_spacings = np.diff(x_coords)
+                    
+                    # For vertical spacing, look at x-coordinates
+                    h_spacings = np.diff(np.sort(points[:, 0]))
                     h_spacing = float(np.median(h_spacings[h_spacings > 0]))
                 else:
+                    v_spacing = grid_info.get('vertical_spacing', 10.0)
                     h_spacing = grid_info.get('horizontal_spacing', 10.0)
             except (KeyError, IndexError, TypeError, ValueError) as e:
                 # Fallback to spacing-based calibration if intersection parsing fails
@@ -308,6 +526,49 @@ class ECGDigitizer:
             'grid_spacing_v': v_spacing
         }
     
+    @staticmethod
+    def _intersection_points(intersections: List) -> np.ndarray:
+        """
+        Intersection coordinates as an (N, 2) array of (x, y)
+        
+        Entries that can't be read as a coordinate pair are skipped.
+        """
+        try:
+            # Fast path: GridDetector's {'x': float, 'y': float} dicts
+            return np.array([(item['x'], item['y']) for item in intersections],
+                            dtype=np.float64).reshape(-1, 2)
+        except (KeyError, IndexError, TypeError, ValueError):
+            pass
+        
+        points = []
+        for item in intersections:
+            if isinstance(item, dict):
+                # Dictionary format: {'x': ..., 'y': ...}
+                # Handle nested dicts or direct values
+                x_val = item.get('x')
+                y_val = item.get('y')
+                
+                # If values are dicts, try to extract numeric values
+                if isinstance(x_val, dict):
+                    # Try common keys
+                    x_val = x_val.get('value') or x_val.get('coord') or x_val.get('x')
+                if isinstance(y_val, dict):
+                    y_val = y_val.get('value') or y_val.get('coord') or y_val.get('y')
+            elif isinstance(item, (list, tuple)) and len(item) >= 2:
+                # List/tuple format: [x, y] or (x, y)
+                x_val, y_val = item[0], item[1]
+            else:
+                continue
+            
+            # Convert to float if possible
+            try:
+                if x_val is not None and y_val is not None:
+                    points.append((float(x_val), float(y_val)))
+            except (ValueError, TypeError):
+                continue  # Skip this intersection if conversion fails
+        
+        return np.array(points, dtype=np.float64).reshape(-1, 2)
+    
     def detect_leads(self, image: np.ndarray, grid_info: Dict) -> Dict[str, np.ndarray]:
         """
         Detect the 12 lead regions in the ECG image
@@ -316,91 +577,62 @@ class ECGDigitizer:
         - Usually arranged in 3-4 columns
         - Each lead typically 2.5 seconds long
         """
+        return dict(zip(*self.detect_lead_stack(image, grid_info)))
+    
+    def detect_lead_stack(self, image: np.ndarray,
+                          grid_info: Dict) -> Tuple[List[str], np.ndarray]:
+        """
+        Detect the 12 lead regions as one (12, row_height, col_width) array
+        
+        Returns:
+            (lead_names, stack) - stack[i] is the region of lead_names[i]
+        """
         height, width = image.shape
         
         # Standard layout: 3 columns x 4 rows + 1 long rhythm strip
         # This is a simplified detection - actual implementation should be more robust
         
-        lead_regions = {}
-        
         # Divide into approximate regions (this needs to be improved with actual detection)
         col_width = width // 3
         row_height = height // 5
+        rows, cols = len(LEAD_GRID), len(LEAD_GRID[0])
         
-        lead_positions = [
-            ('I', 0, 0), ('aVR', 1, 0), ('V1', 2, 0),
-            ('II', 0, 1), ('aVL', 1, 1), ('V2', 2, 1),
-            ('III', 0, 2), ('aVF', 1, 2), ('V3', 2, 2),
-            ('V4', 0, 3), ('V5', 1, 3), ('V6', 2, 3),
-        ]
-        
-        for lead_name, col, row in lead_positions:
-            x1 = col * col_width
-            x2 = (col + 1) * col_width
-            y1 = row * row_height
-            y2 = (row + 1) * row_height
-            
-            region = image[y1:y2, x1:x2]
-            lead_regions[lead_name] = region
+        # Split the lead grid into (row, y, col, x) and regroup to (row, col, y, x):
+        # a single copy into one contiguous block, in LEAD_GRID order
+        stack = (image[:rows * row_height, :cols * col_width]
+                 .reshape(rows, row_height, cols, col_width)
+                 .transpose(0, 2, 1, 3)
+                 .reshape(rows * cols, row_height, col_width))
         
-        return lead_regions
+        return [name for row in LEAD_GRID for name in row], stack
+    
+    def _extracts_segmented(self, width: int) -> bool:
+        """True if extract_signal uses segmented processing for this region width"""
+        return bool(self.use_segmented and self.segmented_processor and width > 200)
     
-    def extract_signal(self, region: np.ndarray, calibration: Dict) -> np.ndarray:
+    def extract_signal(self, region: np.ndarray, calibration: Dict,
+                       trace: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Extract time-series signal from a lead region
         Uses grid intersections for alignment if available
         
         Method: For each column (time point), find the darkest pixels (signal path)
+        
+        Args:
+            region: Lead region
+            calibration: Scales from calibrate_scales
+            trace: Standard trace of this region if already computed (batched)
         """
         height, width = region.shape
         signal_values = []
         
+        if trace is not None:
+            signal_array = trace
         # Use segmented processing if enabled and region is large enough
-        if self.use_segmented and self.segmented_processor and width > 200:
+        elif self._extracts_segmented(width):
             def extract_segment_signal(seg_image, params):
-                seg_h, seg_w = seg_image.shape
-                seg_signal = []
-                
-                for col in range(seg_w):
-                    column = seg_image[:, col]
-                    
-                    # Find signal position
-                    if np.mean(column) > 128:
-                        column = 255 - column
-                    
-                    # FEATURE 2.1: Adaptive threshold per column
-                    col_max = np.max(column)
-                    col_mean = np.mean(column)
-                    col_std = np.std(column)
-                    
-                    if col_std > 10:
-                        threshold = np.percentile(column, 75)
-                    else:
-                        threshold = col_mean + col_std
-                    
-                    threshold = max(threshold, col_max * 0.3)
-                    threshold = min(threshold, col_max * 0.8)
-                    
-                    dark_pixels = column > threshold
-                    
-                    if np.any(dark_pixels):
-                        positions = np.where(dark_pixels)[0]
-                        weights = column[dark_pixels]
-                        center = np.average(positions, weights=weights)
-                    else:
-                        # FEATURE 2.1: Better fallback
-                        if len(seg_signal) > 0:
-                            prev_voltage = seg_signal[-1]
-                            center = seg_h / 2 - (prev_voltage * calibration['pixels_per_mv'])
-                            center = np.clip(center, 0, seg_h - 1)
-                        else:
-                            center = seg_h / 2
-                    
-                    voltage_pixels = seg_h / 2 - center
-                    voltage_mv = voltage_pixels / calibration['pixels_per_mv']
-                    seg_signal.append(voltage_mv)
-                
-                return {'signal': np.array(seg_signal)}
+                return {'signal': _trace_voltages(seg_image, calibration['pixels_per_mv'],
+                                                  self.coarse_trace, self.jit_trace)}
             
             result = self.segmented_processor.process_segmented(
                 region, extract_segment_signal, num_segments=(1, max(1, width // 150))
@@ -449,8 +681,8 @@ class ECGDigitizer:
         duration_sec = width / calibration['pixels_per_sec']
         target_samples = int(duration_sec * self.sampling_rate)
         
-        if len(signal_array) > 1:
-            resampled = signal.resample(signal_array, target_samples)
+        if len(signal_array) > 1 and target_samples > 0:
+            resampled = _resample(signal_array, target_samples)
         else:
             resampled = signal_array
         
@@ -460,61 +692,8 @@ class ECGDigitizer:
         """
         FEATURE 2.1: Standard signal extraction with adaptive thresholding
         """
-        height, width = region.shape
-        signal_values = []
-        
-        # FEATURE 2.1: Pre-calculate image statistics for adaptive thresholding
-        region_mean = np.mean(region)
-        region_std = np.std(region)
-        
-        for col in range(width):
-            column = region[:, col]
-            
-            # Find signal position (darkest pixels)
-            if np.mean(column) > 128:  # Light background
-                column = 255 - column
-            
-            # FEATURE 2.1: Adaptive threshold per column
-            # Use local statistics instead of fixed 50% of max
-            col_max = np.max(column)
-            col_mean = np.mean(column)
-            col_std = np.std(column)
-            
-            # Adaptive threshold: use percentile or statistical method
-            if col_std > 10:  # Has variation
-                # Use percentile-based threshold (top 25% darkest)
-                threshold = np.percentile(column, 75)
-            else:
-                # Low variation - use mean-based
-                threshold = col_mean + col_std
-            
-            # Ensure threshold is reasonable
-            threshold = max(threshold, col_max * 0.3)  # At least 30% of max
-            threshold = min(threshold, col_max * 0.8)  # At most 80% of max
-            
-            dark_pixels = column > threshold
-            
-            if np.any(dark_pixels):
-                positions = np.where(dark_pixels)[0]
-                weights = column[dark_pixels]
-                center = np.average(positions, weights=weights)
-            else:
-                # FEATURE 2.1: Better fallback - use previous value or median
-                if len(signal_values) > 0:
-                    # Use previous signal value converted back to pixel position
-                    prev_voltage = signal_values[-1]
-                    center = height / 2 - (prev_voltage * calibration['pixels_per_mv'])
-                    center = np.clip(center, 0, height - 1)
-                else:
-                    center = height / 2  # Default to middle
-            
-            # Convert pixel position to voltage
-            voltage_pixels = height / 2 - center
-            voltage_mv = voltage_pixels / calibration['pixels_per_mv']
-            
-            signal_values.append(voltage_mv)
-        
-        return np.array(signal_values)
+        return _trace_voltages(region, calibration['pixels_per_mv'],
+                               self.coarse_trace, self.jit_trace)
     
     def post_process_signals(self, signals: Dict[str, np.ndarray]) -> List[Dict]:
         """
@@ -522,26 +701,38 @@ class ECGDigitizer:
         - Remove baseline wander
         - Filter noise
         - Align signals
-        """
-        processed = []
         
+        Lead values are float32 arrays; process_ecg_for_firebase turns them
+        into lists only when the result is serialized.
+        """
+        # Leads normally share one shape; stack each same-shape group into a
+        # (leads, ..., samples) array so every filter runs once along the last axis
+        groups = {}
         for lead_name, sig in signals.items():
-            # 1. Remove baseline wander (high-pass filter at 0.5 Hz)
-            sos = signal.butter(3, 0.5, btype='high', fs=self.sampling_rate, output='sos')
-            sig_highpass = signal.sosfilt(sos, sig)
+            groups.setdefault(np.shape(sig), []).append(lead_name)
+        
+        filtered = {}
+        for names in groups.values():
+            stacked = np.stack([signals[name] for name in names])
             
-            # 2. Remove high-frequency noise (low-pass filter at 100 Hz)
-            sos = signal.butter(3, 100, btype='low', fs=self.sampling_rate, output='sos')
-            sig_filtered = signal.sosfilt(sos, sig_highpass)
+            # 1. Remove baseline wander (high-pass filter at 0.5 Hz) and
+            # 2. high-frequency noise (low-pass filter at 100 Hz), in one pass
+            stacked = signal.sosfilt(HP_LP_SOS, stacked, axis=-1)
             
-            # 3. Remove powerline interference (50/60 Hz notch filter)
-            for freq in [50, 60]:
-                b, a = signal.iirnotch(freq, 30, self.sampling_rate)
-                sig_filtered = signal.filtfilt(b, a, sig_filtered)
+            # 3. Remove powerline interference (50/60 Hz notch filter); the
+            # padding is capped so leads shorter than it are still filtered
+            padlen = min(stacked.shape[-1] - 1, NOTCH_PADLEN)
+            for b, a in (NOTCH50, NOTCH60):
+                stacked = signal.filtfilt(b, a, stacked, axis=-1, padlen=padlen)
             
+            filtered.update(zip(names, stacked))
+        
+        processed = []
+        for lead_name in signals:
+            sig_filtered = filtered[lead_name]
             processed.append({
                 'name': lead_name,
-                'values': sig_filtered.tolist(),
+                'values': sig_filtered.astype(np.float32),
                 'sampling_rate': self.sampling_rate,
                 'duration': len(sig_filtered) / self.sampling_rate
             })
@@ -553,14 +744,13 @@ class ECGDigitizer:
         snr_values = []
         
         for lead_data in processed_signals:
-            sig = np.array(lead_data['values'])
+            sig = np.asarray(lead_data['values'], dtype=np.float64)
             
             # Estimate SNR (simplified)
             signal_power = np.mean(sig ** 2)
             
             # Estimate noise from high-frequency components
-            sos = signal.butter(3, [40, 100], btype='band', fs=self.sampling_rate, output='sos')
-            noise = signal.sosfilt(sos, sig)
+            noise = signal.sosfilt(BP_SOS_40_100, sig)
             noise_power = np.mean(noise ** 2)
             
             if noise_power > 0:
@@ -577,15 +767,54 @@ class ECGDigitizer:
         }
 
 
-def process_ecg_for_firebase(image_bytes: bytes) -> Dict:
+def _values_to_lists(result: Dict) -> Dict:
+    """Convert each lead's values array to a list in place (for JSON)"""
+    for lead in result['leads']:
+        lead['values'] = lead['values'].tolist()
+    return result
+
+
+def _quantize_values(result: Dict) -> Dict:
+    """
+    Replace each lead's values with base64 int16 samples in place (for JSON)
+    
+    The lead gets 'values_b64', 'scale', 'dtype' and 'shape' instead of
+    'values'; dequantize() restores the array. Values outside the int16
+    range are clipped.
+    """
+    for lead in result['leads']:
+        steps = np.rint(np.asarray(lead.pop('values'), dtype=np.float64) / QUANT_SCALE)
+        samples = np.clip(steps, -32768, 32767).astype(QUANT_DTYPE)
+        lead['values_b64'] = base64.b64encode(samples.tobytes()).decode('ascii')
+        lead['scale'] = QUANT_SCALE
+        lead['dtype'] = 'int16'
+        lead['shape'] = list(samples.shape)
+    return result
+
+
+def dequantize(lead: Dict) -> np.ndarray:
+    """
+    Values of a lead from process_ecg_for_firebase as a float array (mV)
+    
+    Accepts both quantized leads ('values_b64') and plain 'values' lists.
+    """
+    if 'values_b64' not in lead:
+        return np.asarray(lead['values'], dtype=np.float64)
+    samples = np.frombuffer(base64.b64decode(lead['values_b64']), dtype=QUANT_DTYPE)
+    return samples.reshape(lead.get('shape', -1)) * lead['scale']
+
+
+def process_ecg_for_firebase(image_bytes: bytes, quantize: bool = False) -> Dict:
     """
     Wrapper function for Firebase Cloud Function
     
     Args:
         image_bytes: Image file as bytes
+        quantize: Send lead values as base64 int16 (1 uV steps) instead of
+            float lists - about 4x smaller; read them back with dequantize()
         
     Returns:
-        Processed ECG data as dictionary
+        Processed ECG data as a JSON-ready dictionary
     """
     import tempfile
     import os
@@ -598,7 +827,7 @@ def process_ecg_for_firebase(image_bytes: bytes) -> Dict:
     try:
         digitizer = ECGDigitizer()
         result = digitizer.process_image(tmp_path)
-        return result
+        return _quantize_values(result) if quantize else _values_to_lists(result)
     finally:
         os.unlink(tmp_path)
 
@@ -613,4 +842,4 @@ if __name__ == "__main__":
     
     # Save results
     with open('output.json', 'w') as f:
-        json.dump(result, f, indent=2)
+        json.dump(_values_to_lists(result), f, indent=2)
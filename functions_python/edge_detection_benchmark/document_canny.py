@@ -19,13 +19,15 @@ from edge_detection_benchmark.metrics_calculator import MetricsCalculator
 from edge_detection_benchmark.visualizer import Visualizer
 
 
-def process_document_canny(image_path: str, output_dir: str = None) -> Dict:
+def process_document_canny(image_path: str, output_dir: str = None,
+                           image: np.ndarray = None) -> Dict:
     """
     Process image to extract document boundaries using Canny edge detection.
     
     Args:
         image_path: Path to input image
         output_dir: Optional output directory for saving results
+        image: Already-decoded BGR image (skips reading image_path)
         
     Returns:
         Dictionary with processing results
@@ -38,7 +40,8 @@ def process_document_canny(image_path: str, output_dir: str = None) -> Dict:
     visualizer = Visualizer()
     
     # Load and preprocess
-    image = preprocessor.load_image(image_path)
+    if image is None:
+        image = preprocessor.load_image(image_path)
     preprocessed = preprocessor.preprocess(
         image,
         apply_hsv_mask=False,  # Don't mask for document detection
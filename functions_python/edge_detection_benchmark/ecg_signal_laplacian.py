@@ -21,7 +21,8 @@ from edge_detection_benchmark.visualizer import Visualizer
 
 def process_ecg_signal_laplacian(image_path: str, output_dir: str = None,
                                  apply_skeletonization: bool = True,
-                                 apply_geometric_correction: bool = False) -> Dict:
+                                 apply_geometric_correction: bool = False,
+                                 image: np.ndarray = None) -> Dict:
     """
     Process image to extract ECG signal using Laplacian edge detection.
     
@@ -30,6 +31,7 @@ def process_ecg_signal_laplacian(image_path: str, output_dir: str = None,
         output_dir: Optional output directory for saving results
         apply_skeletonization: Whether to apply skeletonization for 1-pixel-wide lines
         apply_geometric_correction: Whether to apply TPS/Affine correction
+        image: Already-decoded BGR image (skips reading image_path)
         
     Returns:
         Dictionary with processing results
@@ -42,7 +44,8 @@ def process_ecg_signal_laplacian(image_path: str, output_dir: str = None,
     visualizer = Visualizer()
     
     # Load and preprocess with HSV masking for signal
-    image = preprocessor.load_image(image_path)
+    if image is None:
+        image = preprocessor.load_image(image_path)
     preprocessed = preprocessor.preprocess(
         image,
         apply_hsv_mask=True,  # Mask to isolate ECG signal
@@ -1,10 +1,14 @@
 """
 Visualizer Module
 Matplotlib routines for visualizing edge detection results
+
+Figures are built with the object-oriented API (matplotlib.figure.Figure)
+rather than pyplot, so they hold no global state and can be created from
+several threads at once (benchmark_all runs the six methods in parallel).
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from typing import Dict, List, Optional, Tuple
 import cv2
 
@@ -27,7 +31,7 @@ class Visualizer:
                            canny_result: Dict,
                            sobel_result: Dict,
                            laplacian_result: Dict,
-                           title: str = "Edge Detection Comparison") -> plt.Figure:
+                           title: str = "Edge Detection Comparison") -> Figure:
         """
         Generate a 2x2 grid showing Original vs. 3 Edge results.
         
@@ -41,7 +45,8 @@ class Visualizer:
         Returns:
             Matplotlib figure
         """
-        fig, axes = plt.subplots(2, 2, figsize=self.figsize)
+        fig = Figure(figsize=self.figsize)
+        axes = fig.subplots(2, 2)
         fig.suptitle(title, fontsize=16, fontweight='bold')
         
         # Original image
@@ -74,13 +79,13 @@ class Visualizer:
         ax.set_title('Laplacian Edge Detection', fontsize=12, fontweight='bold')
         ax.axis('off')
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
     
     def plot_document_extraction(self, original: np.ndarray,
                                 edge_map: np.ndarray,
                                 corners: List[List[int]],
-                                method: str = "Edge Detection") -> plt.Figure:
+                                method: str = "Edge Detection") -> Figure:
         """
         Visualize document boundary extraction.
         
@@ -93,7 +98,8 @@ class Visualizer:
         Returns:
             Matplotlib figure
         """
-        fig, axes = plt.subplots(1, 2, figsize=(16, 8))
+        fig = Figure(figsize=(16, 8))
+        axes = fig.subplots(1, 2)
         fig.suptitle(f'Document Boundary Extraction - {method}', fontsize=14, fontweight='bold')
         
         # Original with corners
@@ -122,14 +128,14 @@ class Visualizer:
         ax.set_title('Edge Detection Result', fontsize=12)
         ax.axis('off')
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
     
     def plot_ecg_signal_extraction(self, original: np.ndarray,
                                   edge_map: np.ndarray,
                                   skeletonized: np.ndarray,
                                   coordinates: List[Tuple[int, int]],
-                                  method: str = "Edge Detection") -> plt.Figure:
+                                  method: str = "Edge Detection") -> Figure:
         """
         Visualize ECG signal extraction.
         
@@ -143,7 +149,8 @@ class Visualizer:
         Returns:
             Matplotlib figure
         """
-        fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+        fig = Figure(figsize=(16, 12))
+        axes = fig.subplots(2, 2)
         fig.suptitle(f'ECG Signal Extraction - {method}', fontsize=14, fontweight='bold')
         
         # Original
@@ -187,10 +194,10 @@ class Visualizer:
                    ha='center', va='center', transform=ax.transAxes)
             ax.set_title('Signal Plot', fontsize=11)
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
     
-    def save_figure(self, fig: plt.Figure, filepath: str, dpi: int = 150) -> None:
+    def save_figure(self, fig: Figure, filepath: str, dpi: int = 150) -> None:
         """
         Save figure to file.
         
@@ -200,4 +207,3 @@ class Visualizer:
             dpi: Resolution (dots per inch)
         """
         fig.savefig(filepath, dpi=dpi, bbox_inches='tight')
-        plt.close(fig)
@@ -1786,7 +1786,8 @@ def process_ecg_image(request):
     {
         "image": "base64_encoded_image",
         "recordId": "record_id",
-        "imageId": "image_id"
+        "imageId": "image_id",
+        "quantize": false  (optional: lead values as base64 int16, see dequantize)
     }
     """
     # CORS headers
@@ -1817,7 +1818,8 @@ def process_ecg_image(request):
         image_bytes = base64.b64decode(image_base64)
 
         # Process ECG image
-        result = process_ecg_for_firebase(image_bytes)
+        result = process_ecg_for_firebase(image_bytes,
+                                          quantize=bool(request_json.get('quantize', False)))
 
         # Add metadata
         result['recordId'] = record_id
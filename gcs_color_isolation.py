@@ -51,11 +51,20 @@ CREATED_FILES = []  # Will store GCS paths of all created files
 # GCS Functions
 # ============================================
 
+# One client/bucket handle per run (avoids an auth + connection setup per call)
+_GCS_CLIENT = None
+_GCS_BUCKETS = {}
+
+
 def get_gcs_client():
-    """Get authenticated GCS client."""
+    """Get authenticated GCS client (created once, then reused)."""
+    global _GCS_CLIENT
+    if _GCS_CLIENT is not None:
+        return _GCS_CLIENT
     try:
         from google.cloud import storage
-        return storage.Client()
+        _GCS_CLIENT = storage.Client()
+        return _GCS_CLIENT
     except Exception as e:
         print(f"Error connecting to GCS: {e}")
         print("\nMake sure you have:")
@@ -65,13 +74,22 @@ def get_gcs_client():
         return None
 
 
-def list_gcs_images(bucket_name, folder, limit=None):
-    """List images in GCS bucket."""
+def get_gcs_bucket(bucket_name):
+    """Get a cached Bucket handle (None if GCS is unavailable)."""
     client = get_gcs_client()
     if not client:
+        return None
+    if bucket_name not in _GCS_BUCKETS:
+        _GCS_BUCKETS[bucket_name] = client.bucket(bucket_name)
+    return _GCS_BUCKETS[bucket_name]
+
+
+def list_gcs_images(bucket_name, folder, limit=None):
+    """List images in GCS bucket."""
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return []
     
-    bucket = client.bucket(bucket_name)
     blobs = bucket.list_blobs(prefix=f"{folder}/")
     
     images = []
@@ -88,11 +106,10 @@ def list_gcs_images(bucket_name, folder, limit=None):
 
 def download_from_gcs(bucket_name, blob_path, local_path):
     """Download a file from GCS."""
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return False
     
-    bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_path)
     blob.download_to_filename(local_path)
     return True
@@ -100,11 +117,10 @@ def download_from_gcs(bucket_name, blob_path, local_path):
 
 def upload_to_gcs(local_path, bucket_name, blob_path):
     """Upload a file to GCS and track it."""
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return None
     
-    bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_path)
     blob.upload_from_filename(local_path)
     
@@ -116,11 +132,10 @@ def upload_to_gcs(local_path, bucket_name, blob_path):
 
 def delete_from_gcs(bucket_name, blob_paths):
     """Delete files from GCS."""
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(bucket_name)
+    if bucket is None:
         return False
     
-    bucket = client.bucket(bucket_name)
     deleted = []
     
     for blob_path in blob_paths:
@@ -526,11 +541,10 @@ def delete_specific_files(file_patterns):
     - "v6_color_split/*--s-*"  # All regular (non-keeper) files
     - "v6_color_split/*opencv*"  # All opencv files
     """
-    client = get_gcs_client()
-    if not client:
+    bucket = get_gcs_bucket(GCS_BUCKET)
+    if bucket is None:
         return
     
-    bucket = client.bucket(GCS_BUCKET)
     
     for pattern in file_patterns:
         folder = pattern.split('/')[0]
@@ -0,0 +1,181 @@
+"""Shared notebook patching for kaggle_notebook_v3.ipynb
+Used by final_compliance_update.py, fix_notebook_v3.py and apply_parallel_fix.py:
+1. Load/save the notebook (orjson when installed, Jupyter's 1-space layout)
+2. Replace the sequential submission loop with parallel processing
+"""
+import ast
+import json
+import re
+
+# orjson is optional - used for fast notebook load/save when installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# Leading indentation of each line in orjson's 2-space output
+INDENT_RE = re.compile(rb'^((?:  )+)', re.MULTILINE)
+
+# Submission code cell (Cell 5 - index 5, after the markdown intro at index 0)
+SUBMISSION_CELL = 5
+
+# executor.map needs a module-level worker it can pickle by name, so the
+# fallback wrapper is prepended to the cell instead of nested in it
+SAFE_PROCESS_LINES = [
+    'def _safe_process(img_path):\n',
+    '    """process_image() that returns the zero-signal fallback instead of raising"""\n',
+    '    try:\n',
+    '        return process_image(img_path)\n',
+    '    except Exception as e:\n',
+    '        print(f"  ✗ Error: {e}")\n',
+    '        return {"record_id": extract_record_id(img_path), "signals": {lead: np.zeros(SAMPLES_PER_LEAD) for lead in LEAD_NAMES}, "success": False}\n',
+    '\n',
+    '\n',
+]
+
+# Replaces the sequential loop. Uses ProcessPoolExecutor: digitization is
+# CPU-bound, so threads would serialize on the GIL. Kaggle runs Linux (fork),
+# so process_image and its globals are inherited by the workers without
+# pickling the notebook. executor.map streams results back in order with far
+# less bookkeeping than a future->image dict drained through as_completed.
+# Lines carry no base indent; they are indented to match the replaced loop.
+PARALLEL_LINES = [
+    '# COMPETITION REQUIREMENT: Runtime <= 9 hours\n',
+    '# Using parallel processing to meet this requirement\n',
+    'import os\n',
+    'import time\n',
+    'from concurrent.futures import ProcessPoolExecutor\n',
+    '\n',
+    'results = []\n',
+    'start_time = time.time()\n',
+    '\n',
+    '# Parallel processing, one worker process per CPU core (meets 9-hour requirement)\n',
+    'n_total = len(test_images)\n',
+    'max_workers = min(os.cpu_count() or 4, n_total)\n',
+    'print(f"\\n🚀 Using {max_workers} parallel workers (required for < 9 hour runtime)")\n',
+    '\n',
+    'with ProcessPoolExecutor(max_workers=max_workers) as executor:\n',
+    '    for completed, result in enumerate(executor.map(_safe_process, test_images, chunksize=8), 1):\n',
+    '        results.append(result)\n',
+    '        elapsed = time.time() - start_time\n',
+    '        avg_time = elapsed / completed\n',
+    '        remaining = (n_total - completed) * avg_time\n',
+    "        rid = result.get('record_id', 'unknown')\n",
+    '        status = "✓" if result.get("success") else "✗"\n',
+    '        print(f"  [{completed}/{n_total}] {status} {rid} (~{remaining/60:.1f} min remaining)")\n',
+    '\n',
+    'elapsed_time = time.time() - start_time\n',
+    'print(f"\\n⏱️  Total processing time: {elapsed_time/60:.1f} minutes ({elapsed_time:.1f} seconds)")\n',
+    'if n_total > 0:\n',
+    '    estimated_full_time = elapsed_time * (1000 / n_total) / 3600\n',
+    '    print(f"   Estimated time for full test set (~1000 images): {estimated_full_time:.1f} hours")\n',
+    '\n',
+]
+
+
+def load_notebook(path):
+    """Load a notebook as a dict"""
+    # Read bytes and let the parser decode the UTF-8 itself; both orjson and
+    # json.loads accept bytes, which skips the text-mode decode pass
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def save_notebook(nb, path):
+    """Save a notebook in Jupyter's layout (1-space indent, unescaped UTF-8)"""
+    if ORJSON_AVAILABLE:
+        # orjson only indents by 2, so halve the indentation. JSON strings
+        # cannot contain raw newlines, so every leading space is indentation
+        data = INDENT_RE.sub(lambda m: m.group(1)[:len(m.group(1)) // 2],
+                             orjson.dumps(nb, option=orjson.OPT_INDENT_2))
+        with open(path, 'wb') as f:
+            f.write(data)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(nb, f, indent=1, ensure_ascii=False)
+
+
+def has_parallel(source):
+    """True if the cell source already uses an executor"""
+    return 'ProcessPoolExecutor' in source or 'ThreadPoolExecutor' in source
+
+
+def find_sequential_loop(source):
+    """Find the sequential `for ... in enumerate(test_images, ...)` loop.
+
+    Returns the 1-based (first, last) line span of the loop, widened to take in
+    a `results = []` directly before it, plus the loop's indent column, or None
+    if the cell has no such loop.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    for node in ast.walk(tree):
+        for body in _statement_lists(node):
+            span = _loop_in_block(body)
+            if span is not None:
+                return span
+    return None
+
+
+def _statement_lists(node):
+    """Every statement list directly under node (if/else, try/except/finally, ...)"""
+    for field in ('body', 'orelse', 'finalbody'):
+        block = getattr(node, field, None)
+        if isinstance(block, list):
+            yield block
+    for handler in getattr(node, 'handlers', ()):
+        yield handler.body
+
+
+def _loop_in_block(body):
+    """(first, last, indent) of the test_images loop in one statement list, or None"""
+    for prev, stmt in zip([None] + body, body):
+        if not (isinstance(stmt, ast.For) and isinstance(stmt.iter, ast.Call)):
+            continue
+        func, args = stmt.iter.func, stmt.iter.args
+        if not (isinstance(func, ast.Name) and func.id == 'enumerate' and args
+                and isinstance(args[0], ast.Name) and args[0].id == 'test_images'):
+            continue
+        first = stmt.lineno
+        if (isinstance(prev, ast.Assign) and isinstance(prev.value, ast.List)
+                and not prev.value.elts
+                and any(isinstance(t, ast.Name) and t.id == 'results' for t in prev.targets)):
+            first = prev.lineno
+        return first, stmt.end_lineno, stmt.col_offset
+    return None
+
+
+def replace_sequential_with_parallel(nb, cell_idx=SUBMISSION_CELL):
+    """Swap the cell's sequential loop for PARALLEL_LINES; True if it was replaced"""
+    cell = nb['cells'][cell_idx]
+    source = ''.join(cell['source'])
+    span = find_sequential_loop(source)
+    if span is None:
+        return False
+
+    # Splice by line: ast column offsets are UTF-8 byte offsets, and the cell
+    # has non-ASCII text. The loop's own offset is safe - indentation is ASCII
+    first, last, indent = span
+    lines = source.splitlines(keepends=True)
+    parallel = [' ' * indent + line for line in PARALLEL_LINES]
+    cell['source'] = SAFE_PROCESS_LINES + lines[:first - 1] + parallel + lines[last:]
+    return True
+
+
+if __name__ == '__main__':
+    # Self-check against the real notebook: the sequential loop must be found
+    import sys
+    nb = load_notebook('kaggle_notebook_v3.ipynb')
+    found = [i for i, cell in enumerate(nb['cells'])
+             if cell.get('cell_type') == 'code'
+             and find_sequential_loop(''.join(cell.get('source', []))) is not None]
+    if not found:
+        sys.exit("❌ No sequential test_images loop found in kaggle_notebook_v3.ipynb")
+    if found[0] != SUBMISSION_CELL:
+        sys.exit(f"❌ Loop is in cell index {found[0]}, but SUBMISSION_CELL = {SUBMISSION_CELL}")
+    print(f"✅ Sequential loop found in cell index {found[0]} (SUBMISSION_CELL)")
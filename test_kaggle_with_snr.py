@@ -345,7 +345,7 @@ def process_image_and_calculate_snr(image_path: str, record_id: Optional[str] =
             'predicted_signals': predicted_signals,
             'ground_truth_signals': ground_truth_signals,
             'snr': snr,
-            'leads_extracted': len([l for l in result.get('leads', []) if l.get('values')])
+            'leads_extracted': len([l for l in result.get('leads', []) if len(l.get('values', ())) > 0])
         }
         
     except Exception as e: